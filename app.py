@@ -1,34 +1,62 @@
+import json
 import dash_bootstrap_components as dbc
+import plotly.io as pio
 
-from dash import Dash, html, dcc, page_registry, page_container, callback_context
-from dash.dependencies import Input, Output
+from dash import Dash, html, dcc, page_registry, page_container
+from dash.dependencies import ALL, Input, Output, State
+from flask import g
+from common import dataset
+from common.refresh import start_watcher
+from definitions import API, COMPRESS, JSON_ENGINE, METRICS, PROFILE_ALL, PROFILE_TOKEN, WARMUP
 
 
+# Dash encodes callback responses with plotly's JSON encoder; figure payloads are orjson-native (see figure_payload)
+pio.json.config.default_engine = JSON_ENGINE
+
 app = Dash(__name__, use_pages=True, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
 
+# WSGI entry point for production servers: gunicorn -c gunicorn.conf.py (app:server)
+server = app.server
 
-def get_nav_link_style(page_path: str) -> dict:
+if COMPRESS:
+    from web.compression import install_compression
+    install_compression(app)
 
-    ctx = callback_context
-    pathname = ctx.request.args.get('pathname') if ctx and hasattr(ctx, 'request') else None
 
-    base_style = {
-        "margin": "0 10px",
-        "textDecoration": "none",
-        "color": "#22223b",
-        "fontWeight": "bold",
-        "padding": "6px 16px",
-        "borderRadius": "6px",
-        "transition": "background 0.2s"
-    }
-    # If pathname matches, highlight the link
-    if pathname and page_path == pathname:
-        base_style.update({
-            "background": "#c9ada7",
-            "color": "#fff",
-            "boxShadow": "0 2px 8px rgba(0,0,0,0.07)"
-        })
-    return base_style
+NAV_LINK_STYLE = {
+    "margin": "0 10px",
+    "textDecoration": "none",
+    "color": "#22223b",
+    "fontWeight": "bold",
+    "padding": "6px 16px",
+    "borderRadius": "6px",
+    "transition": "background 0.2s"
+}
+
+
+NAV_LINK_ACTIVE_STYLE = {
+    **NAV_LINK_STYLE,
+    "background": "#c9ada7",
+    "color": "#fff",
+    "boxShadow": "0 2px 8px rgba(0,0,0,0.07)"
+}
+
+
+def build_nav_links() -> list:
+    """
+    Builds one link per registered page. The pages are fixed once the app is created, so the links
+    are rendered once and only their style changes with the URL (see the clientside callback below).
+    """
+    return [
+        dcc.Link(
+            page['name'],
+            href=page['path'],
+            id={"type": "nav-link", "index": page['path']},
+            style=NAV_LINK_STYLE
+        )
+        for page in page_registry.values()
+    ]
+
 
 app.layout = html.Div(
     [
@@ -91,6 +119,7 @@ app.layout = html.Div(
         ),
         dcc.Location(id="url"),
         html.Nav(
+            build_nav_links(),
             id="navbar",
             style={
                 "marginBottom": "1em",
@@ -111,38 +140,55 @@ app.layout = html.Div(
 )
 
 
-@app.callback(
-    Output("navbar", "children"),
-    Input("url", "pathname")
+# Highlighting the current page only restyles the links, so it runs in the browser
+app.clientside_callback(
+    f"""
+    function(pathname, ids) {{
+        const style = {json.dumps(NAV_LINK_STYLE)};
+        const activeStyle = {json.dumps(NAV_LINK_ACTIVE_STYLE)};
+        return ids.map(id => id.index === pathname ? activeStyle : style);
+    }}
+    """,
+    Output({"type": "nav-link", "index": ALL}, "style"),
+    Input("url", "pathname"),
+    State({"type": "nav-link", "index": ALL}, "id")
 )
-def update_navbar(pathname):
-    nav_links = []
-    for page in page_registry.values():
-        style = {
-            "margin": "0 10px",
-            "textDecoration": "none",
-            "color": "#22223b",
-            "fontWeight": "bold",
-            "padding": "6px 16px",
-            "borderRadius": "6px",
-            "transition": "background 0.2s"
-        }
-        if pathname == page['path']:
-            style.update({
-                "background": "#c9ada7",
-                "color": "#fff",
-                "boxShadow": "0 2px 8px rgba(0,0,0,0.07)"
-            })
-        nav_links.append(
-            dcc.Link(
-                page['name'],
-                href=page['path'],
-                style=style
-            )
-        )
-    return nav_links
+
+@app.server.before_request
+def pin_dataset():
+    # Every callback of a request reads the same dataset snapshot, even if a refresh swaps it meanwhile
+    g.dataset_token = dataset.pin()
+
+
+@app.server.teardown_request
+def unpin_dataset(error=None):
+    if 'dataset_token' in g:
+        dataset.unpin(g.pop('dataset_token'))
+
+
+if METRICS:
+    from web.metrics import install_metrics
+    install_metrics(app)
+
+if API:
+    from web.api import install_api
+    install_api(app)
+
+# The download links of the trends page point here
+from web.export import install_export
+install_export(app)
+
+if PROFILE_ALL or PROFILE_TOKEN:
+    from web.profiling import install_profiling
+    install_profiling(app)
+
+start_watcher()
 
 if __name__ == '__main__':
+    if WARMUP:
+        from warmup import run_warmup
+        run_warmup()
+
     app.run(
         debug=True
     )
\ No newline at end of file
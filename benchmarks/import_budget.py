@@ -0,0 +1,52 @@
+"""
+Measures the cost of `import app` in a fresh interpreter and checks it against a time budget.
+
+    python -m benchmarks.import_budget [--budget SECONDS] [--module app]
+
+Exits with status 1 when the import is over budget or when it loads the dataset eagerly.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from definitions import ROOT_DIR
+
+
+DEFAULT_BUDGET_SECONDS = float(os.getenv('SUBSIDIOS_IMPORT_BUDGET', '2.5'))
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+import common
+print(elapsed, common.dataset.is_loaded, 'plotly.express' in sys.modules)
+"""
+
+
+def measure_import(module: str = 'app') -> tuple[float, bool, bool]:
+    """Returns (seconds, dataset_loaded, plotly_express_loaded) for importing module in a new process."""
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[0]), output[1] == 'True', output[2] == 'True'
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_SECONDS)
+    parser.add_argument('--module', default='app')
+    args = parser.parse_args()
+
+    seconds, dataset_loaded, px_loaded = measure_import(args.module)
+    print(f"import {args.module}: {seconds:.3f}s (budget {args.budget:.3f}s)")
+    print(f"dataset loaded at import: {dataset_loaded}")
+    print(f"plotly.express loaded at import: {px_loaded}")
+
+    return 0 if seconds <= args.budget and not dataset_loaded else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Times the ingest pipeline and the analysis functions on synthetic exports of several sizes.
+
+    python -m benchmarks.suite [--scales 10000 100000 1000000] [--repeat 3] [--output PATH] [--compare PATH]
+
+Every case reports the median wall time over --repeat runs and its peak traced memory (tracemalloc,
+measured in a separate run so tracing does not skew the timings). The figure payloads of the pages are
+also encoded with both JSON engines and their raw, gzip and brotli sizes recorded. Results are written as JSON; with
+--compare, cases slower than --threshold times the earlier run are listed and the exit status is 1.
+"""
+import argparse
+import gc
+import gzip
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from definitions import ROOT_DIR
+from .synthetic import ensure_export
+
+
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+
+def measure(func, repeat: int) -> dict:
+    """
+    Runs func once to warm up (lazy imports, first figure), repeat timed times, then once more under
+    tracemalloc, and returns the timings and the peak memory.
+    """
+    func()
+    runs = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': statistics.median(runs), 'runs': runs, 'peak_bytes': peak}
+
+
+def ingest_cases(csv_path: str, rows: int, cache_dir: str) -> dict:
+    """Cases covering the CSV to Parquet pipeline of load_data, writing the cache under cache_dir."""
+    from common.data_profile import DatasetProfile
+    from common.load_data import compact_dtypes, file_fingerprint, preprocess_data, read_cache, write_cache
+
+    cache_path = os.path.join(cache_dir, 'cache.parquet')
+    fingerprint = file_fingerprint(csv_path)
+    df = preprocess_data(csv_path)
+    write_cache(df, cache_path, fingerprint)
+
+    return {
+        'ingest.preprocess_data': lambda: preprocess_data(csv_path),
+        'ingest.preprocess_data_chunked': lambda: preprocess_data(csv_path, max(rows // 10, 1000)),
+        'ingest.profile': lambda: DatasetProfile.from_frame(df),
+        'ingest.write_cache': lambda: write_cache(df, cache_path, fingerprint),
+        'ingest.read_cache': lambda: read_cache(cache_path, csv_path),
+        'ingest.compact_dtypes': lambda: compact_dtypes(df),
+    }
+
+
+def aggregation_cases(df: pd.DataFrame) -> dict:
+    """The group-by kernel against the equivalent pandas groupby, on one key and on the five ingest keys."""
+    from common.aggregation import Grouping, group_sums, with_codes
+    from common.load_data import DIMENSION_COLUMNS, GROUP_KEYS, SUM_COLUMNS, compact_dtypes
+
+    compact = compact_dtypes(df)
+    return {
+        'groupby.five_keys.pandas': lambda: df.groupby(GROUP_KEYS, as_index=False)[SUM_COLUMNS].sum(),
+        'groupby.five_keys.kernel': lambda: group_sums(df, GROUP_KEYS, SUM_COLUMNS),
+        'groupby.five_keys_categorical.pandas': lambda: compact.groupby(GROUP_KEYS, as_index=False, observed=True)[SUM_COLUMNS].sum(),
+        'groupby.five_keys_categorical.kernel': lambda: group_sums(compact, GROUP_KEYS, SUM_COLUMNS),
+        'groupby.top_departments.pandas': lambda: df.groupby('departamento', observed=True)['hogares'].sum().nlargest(5),
+        'groupby.top_departments.kernel': lambda: (lambda g: g.top_k(g.sum(df['hogares']), 5))(Grouping.by(df, 'departamento')),
+        'build.with_codes': lambda: with_codes(df, DIMENSION_COLUMNS),
+    }
+
+
+def analysis_cases(df: pd.DataFrame) -> dict:
+    """Cases for the analysis functions behind the pages, on rows and on the precomputed structures."""
+    from common.cube import YearCube
+    from common.data_analysis import (
+        box_plots, get_lines_plots, get_summary_by_program, get_summary_statistics, graph_variable, top_5_regions
+    )
+    from common.indexes import FilteredView
+    from common.quantile_cube import QuantileCube
+    from common.rankings import RegionRankings
+
+    from common.aggregation import with_codes
+    from common.load_data import DIMENSION_COLUMNS
+
+    coded = with_codes(df, DIMENSION_COLUMNS)
+    cube, quantiles, view = YearCube(df), QuantileCube(df), FilteredView.build(df)
+    rankings = RegionRankings(coded)
+    top_departments = list(df.groupby('departamento', observed=True)['hogares'].sum().nlargest(3).index)
+    program = df['programa'].value_counts().index[0]
+
+    return {
+        'build.year_cube': lambda: YearCube(df),
+        'build.quantile_cube': lambda: QuantileCube(df),
+        'build.filtered_view': lambda: FilteredView.build(df),
+        'get_lines_plots.rows': lambda: get_lines_plots(df, top_departments, [], []),
+        'get_lines_plots.view': lambda: get_lines_plots(view, top_departments, [], []),
+        'get_lines_plots.cube': lambda: get_lines_plots(df, top_departments, [], [], cube=cube),
+        'graph_variable.numeric': lambda: graph_variable(df, 'valor_por_hogar', 'Valor por hogar'),
+        'graph_variable.categorical': lambda: graph_variable(df, 'municipio', 'Municipio'),
+        'graph_variable.categorical_coded': lambda: graph_variable(coded, 'municipio', 'Municipio'),
+        'get_summary_statistics': lambda: get_summary_statistics(df, 'valor_asignado'),
+        'get_summary_statistics.categorical': lambda: get_summary_statistics(df, 'municipio'),
+        'get_summary_statistics.categorical_coded': lambda: get_summary_statistics(coded, 'municipio'),
+        'top_5_regions.rows': lambda: top_5_regions(df[df['programa'] == program], 'hogares'),
+        'box_plots.rows': lambda: box_plots(top_5_regions(df[df['programa'] == program], 'hogares'), 'hogares', 50),
+        'box_plots.view': lambda: box_plots(top_5_regions(view.where(programa=[program]), 'hogares'), 'hogares', 50),
+        'box_plots.digests': lambda: box_plots(
+            top_5_regions(quantiles.digests_by('departamento', 'hogares', programa=[program]), 'hogares'), 'hogares', 50
+        ),
+        'get_summary_by_program': lambda: get_summary_by_program(df),
+        'get_summary_by_program.coded': lambda: get_summary_by_program(coded),
+        'top_5_regions.coded': lambda: top_5_regions(coded, 'hogares'),
+        'build.region_rankings': lambda: RegionRankings(coded),
+        'region_rankings.top': lambda: rankings.top('hogares', 5, program),
+    }
+
+
+def page_payloads(df: pd.DataFrame) -> dict:
+    """The figure payloads the pages send, wrapped like a Dash callback response."""
+    from common.data_analysis import box_plots, figure_payload, get_lines_plots, graph_variable, top_5_regions
+    from common.indexes import FilteredView
+
+    program = df['programa'].value_counts().index[0]
+    figures = {
+        'graph_variable.numeric': graph_variable(df, 'valor_por_hogar', 'Valor por hogar'),
+        'graph_variable.categorical': graph_variable(df, 'municipio', 'Municipio'),
+        'get_lines_plots': get_lines_plots(df, [], [], []),
+        'box_plots': box_plots(top_5_regions(FilteredView.build(df).where(programa=[program]), 'hogares'), 'hogares', 50),
+    }
+    return {
+        name: {'multi': True, 'response': {'graph': {'figure': figure_payload(figure)}}}
+        for name, figure in figures.items()
+    }
+
+
+def serialization_cases(payloads: dict) -> dict:
+    """Encoding each payload the way Dash does (plotly.io.json), with the standard library and with orjson."""
+    from plotly.io.json import to_json_plotly
+
+    return {
+        f"serialize.{name}.{engine}": (lambda payload=payload, engine=engine: to_json_plotly(payload, engine=engine))
+        for name, payload in payloads.items()
+        for engine in ('json', 'orjson')
+    }
+
+
+def payload_sizes(payloads: dict, rows: int) -> list[dict]:
+    """Bytes on the wire for each payload: uncompressed, gzip (level 6) and brotli (level 4)."""
+    import brotli
+    from plotly.io.json import to_json_plotly
+
+    sizes = []
+    for name, payload in payloads.items():
+        raw = to_json_plotly(payload, engine='orjson').encode('utf-8')
+        sizes.append({
+            'rows': rows,
+            'case': f"payload.{name}",
+            'raw_bytes': len(raw),
+            'gzip_bytes': len(gzip.compress(raw, compresslevel=6)),
+            'br_bytes': len(brotli.compress(raw, quality=4)),
+        })
+    return sizes
+
+
+def run_suite(scales: list[int], repeat: int, seed: int = 0, only: str | None = None) -> list[dict]:
+    """Runs every case at every scale and returns one result dict per (scale, case)."""
+    from common.load_data import preprocess_data
+
+    results = []
+    for rows in scales:
+        # The Parquet cache written by the ingest cases is removed once the scale is done
+        with tempfile.TemporaryDirectory(prefix='subsidios-bench-') as cache_dir:
+            csv_path = ensure_export(rows, seed)
+            df = preprocess_data(csv_path)
+            payloads = page_payloads(df)
+            cases = {
+                **ingest_cases(csv_path, rows, cache_dir), **aggregation_cases(df), **analysis_cases(df), **serialization_cases(payloads)
+            }
+
+            for name, func in cases.items():
+                if only and only not in name:
+                    continue
+                result = {'rows': rows, 'aggregated_rows': len(df), 'case': name, **measure(func, repeat)}
+                results.append(result)
+                print(f"{rows:>10} {name:<45} {result['seconds'] * 1000:10.1f} ms {result['peak_bytes'] / 1e6:10.1f} MB", flush=True)
+
+            for size in payload_sizes(payloads, rows):
+                if only and only not in size['case']:
+                    continue
+                results.append(size)
+                print(
+                    f"{rows:>10} {size['case']:<45} {size['raw_bytes']:>10} B raw {size['gzip_bytes']:>8} B gzip"
+                    f" {size['br_bytes']:>8} B br", flush=True
+                )
+
+    return results
+
+
+def environment() -> dict:
+    """Describes the run, so results from different machines or commits are not compared blindly."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def compare(results: list[dict], baseline_path: str, threshold: float) -> list[str]:
+    """Returns a line for every case that is more than threshold times slower than in the baseline file."""
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = {(r['rows'], r['case']): r for r in json.load(file)['results']}
+
+    regressions = []
+    for result in results:
+        before = baseline.get((result['rows'], result['case']))
+        if 'seconds' not in result:
+            continue
+        if before and before['seconds'] > 0 and result['seconds'] / before['seconds'] > threshold:
+            regressions.append(
+                f"{result['rows']} {result['case']}: {before['seconds'] * 1000:.1f} ms -> {result['seconds'] * 1000:.1f} ms"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help="Raw rows per synthetic export")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', default=None, help="Run only the cases whose name contains this text")
+    parser.add_argument('--output', default=None, help="JSON results path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', default=None, help="Earlier JSON results to check for regressions")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    meta = environment()
+    results = run_suite(args.scales, args.repeat, args.seed, args.only)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{meta['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump({'environment': meta, 'seed': args.seed, 'repeat': args.repeat, 'results': results}, file, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
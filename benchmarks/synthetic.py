@@ -0,0 +1,138 @@
+"""
+Writes a seeded synthetic export with the raw schema of the datos.gov.co subsidies CSV.
+
+    python -m benchmarks.synthetic --rows 1000000 [--seed 0] [--output PATH]
+
+Departments and their municipality counts follow the DIVIPOLA division. Rows are skewed towards the
+populous departments and the large programs, households follow a Zipf law and the value per household
+is log-normal around a per-program level. The same seed and row count always produce the same file.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from definitions import CACHE_DIR
+
+
+# (DIVIPOLA code, department, number of municipalities)
+DEPARTMENTS = [
+    (5, 'ANTIOQUIA', 125), (8, 'ATLÁNTICO', 23), (11, 'BOGOTÁ, D.C.', 1), (13, 'BOLÍVAR', 46),
+    (15, 'BOYACÁ', 123), (17, 'CALDAS', 27), (18, 'CAQUETÁ', 16), (19, 'CAUCA', 42),
+    (20, 'CESAR', 25), (23, 'CÓRDOBA', 30), (25, 'CUNDINAMARCA', 116), (27, 'CHOCÓ', 30),
+    (41, 'HUILA', 37), (44, 'LA GUAJIRA', 15), (47, 'MAGDALENA', 30), (50, 'META', 29),
+    (52, 'NARIÑO', 64), (54, 'NORTE DE SANTANDER', 40), (63, 'QUINDIO', 12), (66, 'RISARALDA', 14),
+    (68, 'SANTANDER', 87), (70, 'SUCRE', 26), (73, 'TOLIMA', 47), (76, 'VALLE DEL CAUCA', 42),
+    (81, 'ARAUCA', 7), (85, 'CASANARE', 19), (86, 'PUTUMAYO', 13), (88, 'ARCHIPIÉLAGO DE SAN ANDRÉS', 2),
+    (91, 'AMAZONAS', 11), (94, 'GUAINÍA', 9), (95, 'GUAVIARE', 4), (97, 'VAUPÉS', 6), (99, 'VICHADA', 4),
+]
+
+# (program, share of rows, median value per household in pesos)
+PROGRAMS = [
+    ('MI CASA YA', 0.34, 24_000_000),
+    ('Bolsa Desplazados', 0.16, 18_000_000),
+    ('Programa Vivienda Gratuita Fase I', 0.10, 45_000_000),
+    ('Programa Vivienda Gratuita Fase II', 0.05, 50_000_000),
+    ('Bolsa Ordinaria', 0.08, 12_000_000),
+    ('Semillero de Propietarios - Arrendamiento', 0.06, 8_000_000),
+    ('Semillero de Propietarios - Ahorradores', 0.04, 20_000_000),
+    ('Programa de Vivienda de Interés Prioritario para Ahorradores', 0.05, 22_000_000),
+    ('Bolsa Esfuerzo Territorial', 0.03, 15_000_000),
+    ('Bolsa Desastres Naturales', 0.03, 16_000_000),
+    ('Bolsa Reubicación', 0.02, 14_000_000),
+    ('Bolsa Macroproyectos', 0.02, 19_000_000),
+    ('Bolsa Concejales', 0.01, 10_000_000),
+    ('Bolsa Atentados Terroristas', 0.01, 11_000_000),
+]
+
+STATES = [('Asignados', 0.82), ('Legalizados', 0.08), ('Renuncia', 0.06), ('Vencidos', 0.04)]
+YEARS = np.arange(2003, 2026)
+
+COLUMNS = [
+    'Código División Política Departamento', 'Departamento', 'Código División Política Municipio',
+    'Municipio', 'Programa', 'Año de Asignación', 'Estado de Postulación', 'Hogares', 'Valor Asignado',
+]
+
+
+def municipalities() -> pd.DataFrame:
+    """Returns one row per municipality with its department, DIVIPOLA codes and a skewed row weight."""
+    rows = []
+    for dept_code, dept, count in DEPARTMENTS:
+        for number in range(count):
+            name = f"{dept} - CAPITAL" if number == 0 else f"{dept} - MUNICIPIO {number}"
+            rows.append((dept_code, dept, dept_code * 1000 + 1 + number * 3, name, number))
+    frame = pd.DataFrame(rows, columns=['dept_code', 'dept', 'mun_code', 'mun', 'rank'])
+    # Capitals and large departments concentrate most of the subsidies
+    frame['weight'] = 1.0 / (frame['rank'] + 1) ** 1.1
+    return frame
+
+
+def generate_export(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Returns `rows` synthetic raw rows, reproducible for a given seed."""
+    rng = np.random.default_rng(seed)
+    muns = municipalities()
+
+    mun_index = rng.choice(len(muns), size=rows, p=(muns['weight'] / muns['weight'].sum()).to_numpy())
+    shares = np.array([share for _, share, _ in PROGRAMS])
+    program_index = rng.choice(len(PROGRAMS), size=rows, p=shares / shares.sum())
+    state_shares = np.array([share for _, share in STATES])
+    state_index = rng.choice(len(STATES), size=rows, p=state_shares / state_shares.sum())
+    year_weights = np.linspace(1, 3, len(YEARS))
+
+    hogares = np.minimum(rng.zipf(1.8, size=rows), 5000)
+    program_median = np.array([median for _, _, median in PROGRAMS])[program_index]
+    valor_por_hogar = program_median * rng.lognormal(0.0, 0.35, size=rows)
+
+    selected = muns.iloc[mun_index]
+    return pd.DataFrame({
+        COLUMNS[0]: selected['dept_code'].to_numpy(),
+        COLUMNS[1]: selected['dept'].to_numpy(),
+        COLUMNS[2]: selected['mun_code'].to_numpy(),
+        COLUMNS[3]: selected['mun'].to_numpy(),
+        COLUMNS[4]: np.array([name for name, _, _ in PROGRAMS], dtype=object)[program_index],
+        COLUMNS[5]: rng.choice(YEARS, size=rows, p=year_weights / year_weights.sum()),
+        COLUMNS[6]: np.array([name for name, _ in STATES], dtype=object)[state_index],
+        COLUMNS[7]: hogares,
+        COLUMNS[8]: np.round(hogares * valor_por_hogar).astype('int64'),
+    })
+
+
+def write_export(path: str, rows: int, seed: int = 0, chunk_rows: int = 1_000_000) -> str:
+    """
+    Writes the synthetic export to path in chunks of chunk_rows, so 10M-row files do not have to fit
+    in memory. Each chunk uses its own seed derived from seed. Returns path.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as file:
+        for number, start in enumerate(range(0, rows, chunk_rows)):
+            chunk = generate_export(min(chunk_rows, rows - start), seed=seed * 100_003 + number)
+            chunk.to_csv(file, index=False, header=number == 0)
+    os.replace(tmp_path, path)
+    return path
+
+
+def export_path(rows: int, seed: int = 0) -> str:
+    """Returns where the benchmarks keep the synthetic export for a scale, under the cache directory."""
+    return os.path.join(CACHE_DIR, 'benchmarks', f"synthetic_{rows}_{seed}.csv")
+
+
+def ensure_export(rows: int, seed: int = 0) -> str:
+    """Returns the path of the synthetic export for (rows, seed), writing it first if it does not exist."""
+    path = export_path(rows, seed)
+    return path if os.path.exists(path) else write_export(path, rows, seed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="CSV path (default: under the cache directory)")
+    args = parser.parse_args()
+
+    print(write_export(args.output or export_path(args.rows, args.seed), args.rows, args.seed))
+
+
+if __name__ == '__main__':
+    main()
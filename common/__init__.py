@@ -1,10 +1,21 @@
-from .load_data import load_json, df
+from .load_data import load_json
+from .dataset import dataset, get_df
+from .result_cache import cached_result, result_cache
 from .data_analysis import (
     get_data_type, 
     get_summary_statistics, 
     graph_variable, 
+    figure_payload,
     get_lines_plots,
+    rank_regions,
     top_5_regions,
     box_plots,
     get_summary_by_program
-)
\ No newline at end of file
+)
+
+
+def __getattr__(name: str):
+    # `from common import df` keeps working, but only loads the data when it is actually used
+    if name == 'df':
+        return get_df()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
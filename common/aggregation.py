@@ -0,0 +1,166 @@
+"""
+Group-by kernel on integer codes, shared by the ingest aggregation and the analysis functions.
+
+The key columns are turned into integer codes (categoricals already are: their codes are used as they
+are, without copying), combined into one mixed-radix code per row and compacted to dense group ids.
+Sums, means and counts are then one np.bincount over the ids per measure, and rankings take the top k
+groups with np.argpartition instead of sorting every group.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Composite key spaces up to this many times the number of rows are compacted with a bincount, whose
+# arrays are the size of the key space; larger ones, which would be mostly empty, by sorting the codes (np.unique)
+DENSE_KEY_RATIO = 4
+
+# np.bincount accumulates in float64, which represents every integer up to 2**53 exactly
+EXACT_FLOAT_SUM = 2 ** 53
+
+
+def factorize(values: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    """Returns integer codes (-1 for nulls) and the distinct values they index, in sorted order."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes, uniques
+
+
+def with_codes(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    """
+    Returns df with the given text columns as categoricals, so grouping by them reads codes instead of
+    hashing strings. The other columns, and those that already are categoricals, are shared, not copied.
+    """
+    data = {}
+    for name, values in df.items():
+        if name in columns and not isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = pd.factorize(values, sort=True)
+            values = pd.Series(pd.Categorical.from_codes(codes, categories=uniques), name=name, index=df.index)
+        data[name] = values
+    coded = pd.DataFrame(data, index=df.index, copy=False)
+    coded.attrs = df.attrs
+    return coded
+
+
+class Grouping:
+    """
+    The rows of a frame split into groups by one or more key columns, like DataFrame.groupby with
+    observed=True and dropna=True: groups are the key combinations present, in sorted key order, and
+    rows with a null key belong to no group.
+    """
+
+    def __init__(self, keys: list[pd.Series]):
+        self.names = [key.name for key in keys]
+        self.dtypes = [key.dtype for key in keys]
+
+        levels, combined, valid = [], None, None
+        for key in keys:
+            codes, uniques = factorize(key)
+            levels.append(uniques)
+            if (codes < 0).any():
+                valid = codes >= 0 if valid is None else valid & (codes >= 0)
+            combined = codes.astype('int64') if combined is None else combined * len(uniques) + codes
+
+        self.levels = levels
+        shape = tuple(max(len(level), 1) for level in levels)
+        space = int(np.prod(shape, dtype='float64'))
+        if space >= 2 ** 63:
+            raise ValueError("Too many key combinations to encode in 64 bits")
+
+        # Rows with a null key are left out of every reduction
+        self.rows = None if valid is None else np.flatnonzero(valid)
+        if self.rows is not None:
+            combined = combined[self.rows]
+
+        if space <= DENSE_KEY_RATIO * len(combined):
+            present = np.flatnonzero(np.bincount(combined, minlength=space))
+            lookup = np.empty(space, dtype='int64')
+            lookup[present] = np.arange(len(present))
+            self.ids, self.group_codes = lookup[combined], present
+        else:
+            self.group_codes, self.ids = np.unique(combined, return_inverse=True)
+
+        self.shape = shape
+        self.n_groups = len(self.group_codes)
+
+    @classmethod
+    def by(cls, df: pd.DataFrame, keys: str | list[str]) -> 'Grouping':
+        return cls([df[key] for key in ([keys] if isinstance(keys, str) else keys)])
+
+    def _values(self, values: pd.Series | np.ndarray) -> np.ndarray:
+        values = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+        return values if self.rows is None else values[self.rows]
+
+    def size(self) -> np.ndarray:
+        """Number of rows in every group."""
+        return np.bincount(self.ids, minlength=self.n_groups)
+
+    def count(self, values: pd.Series | np.ndarray) -> np.ndarray:
+        """Number of non-null values in every group."""
+        data = self._values(values)
+        if data.dtype.kind != 'f':
+            return self.size()
+        return np.bincount(self.ids, weights=~np.isnan(data), minlength=self.n_groups).astype('int64')
+
+    def sum(self, values: pd.Series | np.ndarray) -> np.ndarray:
+        """
+        Sum of the values in every group, skipping nulls. Integer columns keep an exact int64 result:
+        through the float64 bincount while their total magnitude allows it, by sorted segments otherwise.
+        """
+        data = self._values(values)
+        if data.dtype.kind in 'iub':
+            if not len(data) or float(np.abs(data, dtype='float64').sum()) < EXACT_FLOAT_SUM:
+                return np.bincount(self.ids, weights=data, minlength=self.n_groups).astype('int64')
+            order = np.argsort(self.ids, kind='stable')
+            starts = np.searchsorted(self.ids[order], np.arange(self.n_groups))
+            return np.add.reduceat(data[order].astype('int64'), starts)
+        data = data.astype('float64', copy=False)
+        return np.bincount(self.ids, weights=np.where(np.isnan(data), 0.0, data), minlength=self.n_groups)
+
+    def mean(self, values: pd.Series | np.ndarray) -> np.ndarray:
+        """Mean of the non-null values in every group (NaN for a group without any)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sum(values) / self.count(values)
+
+    def top_k(self, scores: np.ndarray, k: int, ascending: bool = False) -> np.ndarray:
+        """
+        Returns the positions of the k groups with the largest (or smallest) scores, best first. Only
+        those k are sorted; ties are broken by key order and NaN scores rank last.
+        """
+        scores = np.asarray(scores, dtype='float64')
+        keyed = np.where(np.isnan(scores), np.inf, scores if ascending else -scores)
+        k = min(k, len(keyed))
+        if 0 < k < len(keyed):
+            # Every group tied with the k-th is a candidate: argpartition alone picks among them arbitrarily
+            candidates = np.flatnonzero(keyed <= np.partition(keyed, k - 1)[k - 1])
+        else:
+            candidates = np.arange(len(keyed))
+        return candidates[np.lexsort((candidates, keyed[candidates]))][:k]
+
+    def keys(self, positions: np.ndarray | None = None) -> dict[str, pd.Series | np.ndarray]:
+        """The key values of the groups (or of the groups at positions), one array per key column."""
+        group_codes = self.group_codes if positions is None else self.group_codes[positions]
+        level_codes = np.unravel_index(group_codes, self.shape)
+        keys = {}
+        for name, dtype, level, codes in zip(self.names, self.dtypes, self.levels, level_codes):
+            if isinstance(dtype, pd.CategoricalDtype):
+                keys[name] = pd.Categorical.from_codes(codes, dtype=dtype)
+            else:
+                keys[name] = level.take(codes)
+        return keys
+
+    def frame(self, columns: dict[str, np.ndarray], positions: np.ndarray | None = None) -> pd.DataFrame:
+        """
+        The groups as a DataFrame like groupby(..., as_index=False).agg(...) returns: the key columns
+        followed by the given per-group columns, restricted and ordered by positions when given.
+        """
+        data = self.keys(positions)
+        for name, values in columns.items():
+            data[name] = values if positions is None else values[positions]
+        return pd.DataFrame(data)
+
+
+def group_sums(df: pd.DataFrame, keys: list[str], columns: list[str]) -> pd.DataFrame:
+    """Same result as df.groupby(keys, as_index=False, observed=True)[columns].sum(), through Grouping."""
+    grouping = Grouping.by(df, keys)
+    return grouping.frame({column: grouping.sum(df[column]) for column in columns})
@@ -0,0 +1,85 @@
+"""
+Callbacks that may run as Dash background jobs.
+
+A callback registered with heavy_callback runs in the request like any other unless its module.function
+name (the label it has in the /metrics latency histograms) is listed in SUBSIDIOS_BACKGROUND_CALLBACKS.
+Listed callbacks run in a separate process started by a DiskcacheManager, whose job state lives in
+SUBSIDIOS_BACKGROUND_DIR, so no broker is needed. While a job runs the browser polls it, the `running`
+outputs show the loading state and the `progress` outputs the messages sent with set_progress. A job is
+cancelled when its callback fires again (the filters changed) or when one of the `cancel` inputs does.
+"""
+import functools
+import logging
+
+from dash import callback
+from definitions import BACKGROUND_CALLBACKS, BACKGROUND_DIR, BACKGROUND_INTERVAL
+from .dataset import dataset
+
+
+logger = logging.getLogger(__name__)
+
+_manager = None
+
+
+def background_manager():
+    """
+    Returns the DiskcacheManager shared by the background callbacks, creating it on first use. Every job
+    runs in a process forked from the one serving the request, so the dataset and its derived structures
+    are built there first: each job then inherits them instead of rebuilding them (and possibly reloading
+    the data) in a process that is thrown away.
+    """
+    global _manager
+    if _manager is None:
+        import diskcache
+        from dash import DiskcacheManager
+
+        class WarmDiskcacheManager(DiskcacheManager):
+            def call_job_fn(self, key, job_fn, args, context):
+                dataset.warm()
+                return super().call_job_fn(key, job_fn, args, context)
+
+        _manager = WarmDiskcacheManager(diskcache.Cache(BACKGROUND_DIR))
+    return _manager
+
+
+def runs_in_background(func) -> bool:
+    return f"{func.__module__}.{func.__name__}" in BACKGROUND_CALLBACKS
+
+
+def heavy_callback(*dependencies, running=None, progress=None, progress_default=None, cancel=None):
+    """
+    Registers a callback like dash.callback, as a background callback when it is listed in
+    SUBSIDIOS_BACKGROUND_CALLBACKS. With progress outputs, the function receives set_progress as its first
+    argument; it is a no-op when the callback runs in the request. cancel only applies to background runs:
+    in the request the `running` outputs of the cancel components are dropped, so they stay hidden.
+    """
+
+    def decorator(func):
+        if runs_in_background(func):
+            logger.info("Callback %s.%s runs in the background", func.__module__, func.__name__)
+            return callback(
+                *dependencies,
+                background=True,
+                manager=background_manager(),
+                interval=BACKGROUND_INTERVAL,
+                running=running,
+                progress=progress,
+                progress_default=progress_default,
+                cancel=cancel,
+            )(func)
+
+        cancel_ids = {input_.component_id for input_ in cancel or []}
+        in_request_running = [entry for entry in running or [] if entry[0].component_id not in cancel_ids] or None
+
+        if progress is None:
+            return callback(*dependencies, running=in_request_running)(func)
+
+        @functools.wraps(func)
+        def in_request(*args):
+            return func(lambda *_: None, *args)
+
+        callback(*dependencies, running=in_request_running)(in_request)
+        # The module keeps the function as declared (set_progress first) whichever way it is registered
+        return func
+
+    return decorator
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+
+DIMENSIONS = ['departamento', 'municipio', 'programa']
+YEAR = 'ano_de_asignacion'
+
+# Order of the measures along the first axis of every cube array
+HOGARES, VALOR_ASIGNADO, VALOR_POR_HOGAR_SUM, VALOR_POR_HOGAR_COUNT, ROWS = range(5)
+
+
+class YearCube:
+    """
+    Pre-aggregated yearly totals of the dataset for every (departamento, municipio, programa) cell.
+
+    Each array has shape (measure, ..., year) and holds the sums of hogares and valor_asignado, the sum
+    and count of valor_por_hogar (so its mean can be recovered) and the number of rows. Besides the
+    cells, the cube keeps one marginal per dimension and the grand total, so a selection on a single
+    dimension sums a handful of (measure, year) slices and a combined selection only scans the cells,
+    never the rows of the dataset.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        year_codes, self.years = pd.factorize(df[YEAR], sort=True)
+        n_years = len(self.years)
+
+        self.values = {}
+        dim_codes = []
+        for dim in DIMENSIONS:
+            codes, uniques = pd.factorize(df[dim], sort=True)
+            self.values[dim] = {value: code for code, value in enumerate(uniques)}
+            dim_codes.append(codes)
+
+        self.cell_codes, cell_ids = np.unique(np.stack(dim_codes, axis=1), axis=0, return_inverse=True)
+
+        valor_por_hogar = df['valor_por_hogar'].to_numpy(dtype='float64')
+        has_valor_por_hogar = ~np.isnan(valor_por_hogar)
+        weights = [
+            df['hogares'].to_numpy(dtype='float64'),
+            df['valor_asignado'].to_numpy(dtype='float64'),
+            np.where(has_valor_por_hogar, valor_por_hogar, 0.0),
+            has_valor_por_hogar.astype('float64'),
+            np.ones(len(df)),
+        ]
+
+        def reduce(group_codes: np.ndarray, n_groups: int) -> np.ndarray:
+            flat = group_codes * n_years + year_codes
+            return np.stack([
+                np.bincount(flat, weights=w, minlength=n_groups * n_years).reshape(n_groups, n_years)
+                for w in weights
+            ])
+
+        self.cells = reduce(cell_ids.ravel(), len(self.cell_codes))
+        self.marginals = {
+            dim: reduce(codes, len(self.values[dim]))
+            for dim, codes in zip(DIMENSIONS, dim_codes)
+        }
+        self.total = self.cells.sum(axis=1)
+
+    def _codes(self, dim: str, selected: list[str]) -> np.ndarray:
+        lookup = self.values[dim]
+        return np.array(sorted({lookup[value] for value in selected if value in lookup}), dtype='int64')
+
+    def totals(self, depts: list[str], muns: list[str], programs: list[str]) -> np.ndarray:
+        """
+        Returns the (measure, year) totals for the selection. An empty list means no filter on that dimension.
+        """
+        filters = [(dim, selected) for dim, selected in zip(DIMENSIONS, [depts, muns, programs]) if selected]
+
+        if not filters:
+            return self.total
+
+        if len(filters) == 1:
+            dim, selected = filters[0]
+            return self.marginals[dim][:, self._codes(dim, selected)].sum(axis=1)
+
+        mask = np.ones(len(self.cell_codes), dtype=bool)
+        for dim, selected in filters:
+            mask &= np.isin(self.cell_codes[:, DIMENSIONS.index(dim)], self._codes(dim, selected))
+        return self.cells[:, mask].sum(axis=1)
+
+    def yearly(self, depts: list[str], muns: list[str], programs: list[str]) -> pd.DataFrame:
+        """
+        Returns the same yearly frame get_lines_plots builds with a groupby: hogares and valor_asignado
+        summed and valor_por_hogar averaged per ano_de_asignacion, only for years with data.
+        """
+        totals = self.totals(depts, muns, programs)
+        present = totals[ROWS] > 0
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_valor_por_hogar = totals[VALOR_POR_HOGAR_SUM] / totals[VALOR_POR_HOGAR_COUNT]
+
+        return pd.DataFrame({
+            YEAR: np.asarray(self.years)[present],
+            'hogares': totals[HOGARES][present].astype('int64'),
+            'valor_asignado': totals[VALOR_ASIGNADO][present].astype('int64'),
+            'valor_por_hogar': mean_valor_por_hogar[present],
+        })
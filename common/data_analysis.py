@@ -1,11 +1,15 @@
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 
 from plotly.subplots import make_subplots
 from plotly.graph_objects import Figure
 
+from .aggregation import Grouping
+from .cube import YearCube
+from .indexes import FilteredView
+from .sketches import TDigest
+
 
 def get_data_type(df: pd.DataFrame, variable: str) -> str:
     """
@@ -14,75 +18,150 @@ def get_data_type(df: pd.DataFrame, variable: str) -> str:
     return df[variable].dtype.name
 
 
+def is_numeric_variable(df: pd.DataFrame, variable: str) -> bool:
+    """
+    Returns True for integer and float columns of any width (int16, int32, float32, ...).
+    """
+    dtype = df[variable].dtype
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def is_categorical_variable(df: pd.DataFrame, variable: str) -> bool:
+    """
+    Returns True for text columns, whether stored as object, string or category.
+    """
+    dtype = df[variable].dtype
+    return (
+        isinstance(dtype, pd.CategoricalDtype)
+        or pd.api.types.is_object_dtype(dtype)
+        or pd.api.types.is_string_dtype(dtype)
+    )
+
+
+def top_categories(df: pd.DataFrame, variable: str, k: int = 10) -> pd.DataFrame:
+    """
+    Returns the k values of a categorical variable with the most hogares and their total, largest first.
+    """
+    grouping = Grouping.by(df, variable)
+    totals = grouping.sum(df['hogares'])
+    return grouping.frame({'Total Hogares': totals}, grouping.top_k(totals, k))
+
+
 def get_summary_statistics(df: pd.DataFrame, variable: str) -> pd.DataFrame:
     """
     Returns summary statistics for the specified variable.
     """
     
     data_type = get_data_type(df, variable)
-    if data_type in ['int64', 'float64']:
-        return df[variable].describe().reset_index().rename(columns={'index': 'Estadístico', variable: 'Valor'})
-    elif data_type == 'object':
-        return df.groupby(
-            variable, as_index=False
-            )['hogares'].agg(['sum']).rename(
-                columns={'sum': 'Total Hogares'}
-                ).sort_values(
-                    by='Total Hogares', ascending=False
-                    ).head(10)
+    if is_numeric_variable(df, variable):
+        stats = df[variable].describe()
+        return stats.reset_index().rename(columns={'index': 'Estadístico', variable: 'Valor'})
+    elif is_categorical_variable(df, variable):
+        return top_categories(df, variable)
     else:
         raise ValueError(f"Unsupported data type: {data_type}")
 
 
+def box_statistics(data: np.ndarray) -> dict:
+    """
+    Returns what Plotly needs to draw a box without the raw points: quartiles (linear interpolation, as
+    Plotly computes them), whiskers at the most extreme points within 1.5 IQR, mean and standard deviation.
+    """
+    q1, median, q3 = np.quantile(data, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = data[(data >= q1 - 1.5 * iqr) & (data <= q3 + 1.5 * iqr)]
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': inside.min(),
+        'upperfence': inside.max(),
+        'mean': data.mean(),
+        'sd': data.std(),
+    }
+
+
+def digest_box_statistics(digest: TDigest) -> dict:
+    """
+    Returns box_statistics estimated from a t-digest. The quartiles carry the digest's rank error; the
+    whiskers are the 1.5 IQR fences clipped to the exact extremes, instead of the last point inside them.
+    """
+    q1, median, q3 = digest.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': max(digest.min, q1 - 1.5 * iqr),
+        'upperfence': min(digest.max, q3 + 1.5 * iqr),
+        'mean': digest.mean,
+        'sd': digest.std(ddof=0),
+    }
+
+
 def graph_variable(df: pd.DataFrame, variable: str, variable_name: str = None) -> Figure:
     """
     Returns an improved Plotly figure for the specified variable.
-    For numerical variables: shows both histogram and boxplot.
+    For numerical variables: shows both histogram and boxplot. Both are computed here (bin counts and box
+    statistics), so the figure size depends on the number of bins and not on the number of rows.
     For categorical variables: shows a sorted horizontal bar chart of top 10 categories.
     """
     data_type = get_data_type(df, variable)
     
-    if data_type in ['int64', 'float64']:
+    if is_numeric_variable(df, variable):
 
         fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
                             row_heights=[0.7, 0.3],
                             vertical_spacing=0.05,
                             subplot_titles=(f"Histograma de {variable_name}", f"Boxplot de {variable_name}"))
 
+        data = df[variable].dropna().to_numpy(dtype='float64')
+        count, low, high = len(data), data.min(), data.max()
+        q25, q75 = np.quantile(data, [0.25, 0.75])
+
         # Calculate an appropriate number of bins using the Freedman-Diaconis rule
-        data = df[variable].dropna()
-        q25, q75 = data.quantile([0.25, 0.75])
         iqr = q75 - q25
-        bin_width = 2 * iqr / (len(data) ** (1/3)) if iqr > 0 else None
+        bin_width = 2 * iqr / (count ** (1/3)) if iqr > 0 else None
         if bin_width and bin_width > 0:
-            bins = int((data.max() - data.min()) / bin_width)
+            bins = int((high - low) / bin_width)
             bins = max(1, bins)
         else:
             bins = 30  # fallback
 
         if bins > 30:
             bins = 30
-            data = np.log10(data + 1)  # Log transform if too many bins
+            # Log transform if too many bins
+            data = np.log10(data + 1)
             title_suffix = " (Log Transformado)"
         else:
             title_suffix = ""
 
+        counts, edges = np.histogram(data, bins=bins)
+        stats = box_statistics(data)
         fig.add_trace(
-            go.Histogram(x=data, name='Histograma', marker_color='skyblue', nbinsx=bins),
+            go.Bar(
+                x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                customdata=np.column_stack([edges[:-1], edges[1:]]),
+                hovertemplate='[%{customdata[0]:.3g}, %{customdata[1]:.3g}): %{y}<extra></extra>',
+                name='Histograma', marker_color='skyblue'
+            ),
             row=1, col=1
         )
         fig.add_trace(
-            go.Box(x=data, name='Boxplot', marker_color='orange', boxmean='sd', orientation='h'),
+            go.Box(
+                y=['Boxplot'], name='Boxplot', marker_color='orange', boxmean='sd', orientation='h',
+                **{key: [value] for key, value in stats.items()}
+            ),
             row=2, col=1
         )
-        fig.update_layout(height=600, showlegend=False)
+        fig.update_layout(height=600, showlegend=False, bargap=0)
         fig.update_xaxes(title_text=f"{title_suffix} {variable}", row=2, col=1)
         fig.update_yaxes(title_text="Frecuencia", row=1, col=1)
 
-    elif data_type == 'object':
+    elif is_categorical_variable(df, variable):
+        import plotly.express as px
 
-        value_counts = df.groupby([variable], as_index=False)['hogares'].agg(['sum']).rename(columns={'sum': 'Total Hogares'})
-        value_counts = value_counts.sort_values(by='Total Hogares', ascending=False).head(10)
+        value_counts = top_categories(df, variable)
         fig = px.bar(
             value_counts,
             x='Total Hogares', y=variable,
@@ -97,11 +176,42 @@ def graph_variable(df: pd.DataFrame, variable: str, variable_name: str = None) -
     return fig
 
 
-def get_lines_plots(df: pd.DataFrame, depts: list[str], muns: list[str], programs: list[str]) -> Figure:
+def native_values(value):
     """
-    Returns a Plotly figure with multiple line plots for the specified departments, municipalities, and programs.
+    Returns value with object-dtype arrays (category labels) turned into lists. Numeric arrays are kept,
+    so Plotly sends them as typed arrays, and orjson can serialize the result without a cleaning pass.
+    """
+    if isinstance(value, dict):
+        return {key: native_values(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [native_values(item) for item in value]
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def figure_payload(fig: Figure) -> dict:
+    """Returns the figure as the dict a dcc.Graph receives, in a form orjson encodes on its fast path."""
+    return native_values(fig.to_plotly_json())
+
+
+def get_yearly_totals(
+    df: pd.DataFrame | FilteredView,
+    depts: list[str],
+    muns: list[str],
+    programs: list[str]
+) -> pd.DataFrame:
     """
-    filtered_df = df.copy()
+    Returns hogares and valor_asignado summed, and valor_por_hogar averaged, per year for the selection.
+    With a FilteredView the selection is resolved on its indexes and only the matching rows are read.
+    """
+    if isinstance(df, FilteredView):
+        df = df.where(departamento=depts, municipio=muns, programa=programs).to_frame()
+        depts, muns, programs = [], [], []
+
+    filtered_df = df
 
     if depts:
         filtered_df = filtered_df[filtered_df['departamento'].isin(depts)]
@@ -112,16 +222,30 @@ def get_lines_plots(df: pd.DataFrame, depts: list[str], muns: list[str], program
     if programs:
         filtered_df = filtered_df[filtered_df['programa'].isin(programs)]
 
-    filtered_df = filtered_df.groupby(
-        ['ano_de_asignacion'],
-        as_index=False
-    ).agg({
-        'hogares': 'sum',
-        'valor_asignado': 'sum',
-        'valor_por_hogar': 'mean'
+    grouping = Grouping.by(filtered_df, 'ano_de_asignacion')
+
+    return grouping.frame({
+        'hogares': grouping.sum(filtered_df['hogares']),
+        'valor_asignado': grouping.sum(filtered_df['valor_asignado']),
+        'valor_por_hogar': grouping.mean(filtered_df['valor_por_hogar'])
     })
 
-    filtered_df = filtered_df.sort_values(by='ano_de_asignacion')
+
+def get_lines_plots(
+    df: pd.DataFrame | FilteredView,
+    depts: list[str],
+    muns: list[str],
+    programs: list[str],
+    cube: YearCube | None = None
+) -> Figure:
+    """
+    Returns a Plotly figure with multiple line plots for the specified departments, municipalities, and programs.
+    When a YearCube of df is given, the yearly totals are read from it instead of filtering and grouping df.
+    """
+    if cube is not None:
+        filtered_df = cube.yearly(depts, muns, programs)
+    else:
+        filtered_df = get_yearly_totals(df, depts, muns, programs)
 
     fig = make_subplots(
         rows=3, 
@@ -155,48 +279,178 @@ def get_lines_plots(df: pd.DataFrame, depts: list[str], muns: list[str], program
     return fig
 
 
-def top_5_regions(df: pd.DataFrame, variable: str) -> pd.DataFrame:
+def rank_regions(df: pd.DataFrame | FilteredView, variable: str, k: int = 5) -> pd.DataFrame:
     """
-    Returns a DataFrame with the top 5 regions based on the specified variable.
+    Returns the k departments with the largest total of the variable (average for valor_por_hogar),
+    largest first, with that value in a 'sum' or 'mean' column.
     """
-    if variable not in df.columns:
+    columns = df.source.columns if isinstance(df, FilteredView) else df.columns
+    if variable not in columns:
         raise ValueError(f"Variable '{variable}' not found in DataFrame.")
-    
-    if variable == 'valor_por_hogar':
-        summarization_value = 'mean'
+
+    # A view only reads the two columns it ranks by, for its rows
+    if isinstance(df, FilteredView):
+        keys, values = df.column('departamento'), df.column(variable)
     else:
-        summarization_value = 'sum'
-    
-    top_regions = df.groupby(['departamento'], as_index=False)[variable].agg([summarization_value]).sort_values(
-        by=summarization_value, ascending=False
-    ).head(5)
+        keys, values = df['departamento'], df[variable]
 
-    df_top_regions = df[df['departamento'].isin(top_regions['departamento'].unique())]
+    grouping = Grouping([keys])
+    summarization_value = 'mean' if variable == 'valor_por_hogar' else 'sum'
+    scores = grouping.mean(values) if summarization_value == 'mean' else grouping.sum(values)
+    return grouping.frame({summarization_value: scores}, grouping.top_k(scores, k))
 
-    return df_top_regions
+
+def top_5_regions(
+    df: pd.DataFrame | FilteredView | dict[str, TDigest],
+    variable: str
+) -> pd.DataFrame | FilteredView | dict[str, TDigest]:
+    """
+    Returns a DataFrame with the top 5 regions based on the specified variable.
+    Given a FilteredView, returns the view narrowed to those regions instead of masking a copy.
+    Given t-digests of the variable by department, ranks them by their exact sum or mean and returns theirs.
+    """
+    if isinstance(df, dict):
+        def rank(dept: str) -> float:
+            return df[dept].mean if variable == 'valor_por_hogar' else df[dept].sum
+        return {dept: df[dept] for dept in sorted(df, key=rank, reverse=True)[:5]}
+
+    top_regions = list(rank_regions(df, variable, 5)['departamento'])
+
+    if isinstance(df, FilteredView):
+        return df.where(departamento=top_regions)
+
+    return df[df['departamento'].isin(top_regions)]
+
+
+def grouped_box_statistics(values: pd.Series, keys: pd.Series) -> pd.DataFrame:
+    """
+    Returns box_statistics for every group of keys in one vectorized pass: one groupby-quantile for the
+    quartiles, and the whiskers from a second min/max over the values that fall inside each group's fences.
+    """
+    grouped = values.groupby(keys, observed=True, sort=True)
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'median', 'q3']
+
+    iqr = stats['q3'] - stats['q1']
+    low = keys.map(stats['q1'] - 1.5 * iqr).astype('float64')
+    high = keys.map(stats['q3'] + 1.5 * iqr).astype('float64')
+    inside = values.where((values >= low) & (values <= high))
+    stats['lowerfence'] = inside.groupby(keys, observed=True, sort=True).min()
+    stats['upperfence'] = inside.groupby(keys, observed=True, sort=True).max()
+    stats['mean'] = grouped.mean()
+    stats['sd'] = grouped.std(ddof=0)
+
+    return stats
+
+
+def sample_outliers(values: pd.Series, keys: pd.Series, stats: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """
+    Returns up to max_points values beyond the whiskers for every group, evenly spaced in sorted order
+    so the sample keeps the extremes and the spread of the tail.
+    """
+    outside = (values < keys.map(stats['lowerfence']).astype('float64')) | (values > keys.map(stats['upperfence']).astype('float64'))
+    outliers = pd.DataFrame({'key': keys[outside], 'value': values[outside]}).sort_values(['key', 'value'])
+
+    samples = []
+    for key, group in outliers.groupby('key', observed=True, sort=True):
+        if len(group) > max_points:
+            group = group.iloc[np.linspace(0, len(group) - 1, max_points).round().astype(int)]
+        samples.append(group)
+
+    return pd.concat(samples) if samples else outliers
 
 
-def box_plots(df: pd.DataFrame, summarization_value: str) -> Figure:
+def digest_outliers(digests: dict[str, TDigest], stats: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """
+    Returns up to max_points centroids beyond the whiskers for every digest, evenly spaced in sorted order.
+    Tail centroids of a t-digest hold one or a few points, so they stand in for the outlying values.
+    """
+    samples = []
+    for key, dept_stats in stats.iterrows():
+        means = digests[key].means
+        outside = means[(means < dept_stats['lowerfence']) | (means > dept_stats['upperfence'])]
+        if len(outside) > max_points:
+            outside = outside[np.linspace(0, len(outside) - 1, max_points).round().astype(int)]
+        samples.append(pd.DataFrame({'key': key, 'value': outside}))
+
+    return pd.concat(samples) if samples else pd.DataFrame({'key': [], 'value': []})
+
+
+def box_plots(
+    df: pd.DataFrame | FilteredView | dict[str, TDigest],
+    summarization_value: str,
+    max_outliers: int = 0,
+    k: int = 5
+) -> Figure:
+    """
+    Returns a box plot of the variable for the first k departments, in alphabetical order.
+    The boxes are drawn from precomputed statistics (see grouped_box_statistics), so the figure does not
+    carry the departments' rows; up to max_outliers points beyond the whiskers are added per department.
+    Given t-digests of the variable by department (see QuantileCube), the statistics and outliers are
+    estimated from them without reading any rows.
+    """
 
     if summarization_value not in ['valor_asignado', 'hogares', 'valor_por_hogar']:
         raise ValueError("summarization_value must be one of 'valor_asignado', 'hogares', or 'valor_por_hogar'.")
 
-    departments = df['departamento'].unique()
-    departments = sorted(departments)[:5]
+    log_normal = summarization_value != 'valor_por_hogar'
+
+    if isinstance(df, dict):
+        digests = {
+            dept: digest.transformed(np.log) if log_normal else digest
+            for dept, digest in sorted(df.items())[:k]
+        }
+        digests = {dept: digest for dept, digest in digests.items() if digest.count}
+        stats = pd.DataFrame.from_dict(
+            {dept: digest_box_statistics(digest) for dept, digest in digests.items()}, orient='index'
+        )
+        outliers = digest_outliers(digests, stats, max_outliers) if max_outliers > 0 and len(stats) else None
+        return _draw_box_plots(stats, outliers, summarization_value, log_normal)
+
+    if isinstance(df, FilteredView):
+        keys, values = df.column('departamento'), df.column(summarization_value)
+    else:
+        keys, values = df['departamento'], df[summarization_value]
+
+    values = values.astype('float64')
+    if log_normal:
+        values = np.log(values.replace(0, np.nan))
+    present = values.notna()
+    keys, values = keys[present], values[present]
 
+    stats = grouped_box_statistics(values, keys).head(k)
+
+    outliers = None
+    if max_outliers > 0 and len(stats):
+        in_top = keys.isin(stats.index)
+        outliers = sample_outliers(values[in_top], keys[in_top], stats, max_outliers)
+
+    return _draw_box_plots(stats, outliers, summarization_value, log_normal)
+
+
+def _draw_box_plots(stats: pd.DataFrame, outliers: pd.DataFrame | None, summarization_value: str, log_normal: bool) -> Figure:
+    """Draws one precomputed box per row of stats and the outlier points, if any."""
     fig = go.Figure()
 
-    for dept in departments:
-        dept_data = df[df['departamento'] == dept][summarization_value]
-        log_normal = False
-        if summarization_value != 'valor_por_hogar':
-            dept_data = np.log(dept_data.replace(0, np.nan)).dropna()
-            log_normal = True
+    for dept, dept_stats in stats.iterrows():
         fig.add_trace(
             go.Box(
-                y=dept_data,
+                x=[str(dept)],
                 name=str(dept),
-                boxmean='sd'
+                boxmean='sd',
+                **{key: [value] for key, value in dept_stats.items()}
+            )
+        )
+
+    if outliers is not None:
+        fig.add_trace(
+            go.Scatter(
+                x=outliers['key'].astype(str),
+                y=outliers['value'],
+                mode='markers',
+                marker={'color': '#4a4e69', 'size': 4},
+                name='Valores atípicos',
+                showlegend=False
             )
         )
 
@@ -213,11 +467,11 @@ def get_summary_by_program(df: pd.DataFrame) -> pd.DataFrame:
     """
     Returns a DataFrame summarizing the number of households and total assigned value by program.
     """
-    program_coverage = df.groupby(['programa'], as_index=False).agg(
-        hogares=('hogares', 'sum')
-    )
+    grouping = Grouping.by(df, 'programa')
+    hogares = grouping.sum(df['hogares'])
+    order = grouping.top_k(hogares, grouping.n_groups)
 
-    total_hogares = program_coverage['hogares'].sum()
-    program_coverage['porcentaje'] = round((program_coverage['hogares'] / total_hogares) * 100, 2)
+    program_coverage = grouping.frame({'hogares': hogares}, order)
+    program_coverage['porcentaje'] = np.round(hogares[order] / hogares.sum() * 100, 2)
 
-    return program_coverage.sort_values(by='hogares', ascending=False)
+    return program_coverage
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from .sketches import HyperLogLog, TDigest
+
+
+class ColumnProfile:
+    """
+    Mergeable summary of one column: row and null counts, a HyperLogLog distinct count and, for numeric
+    columns, min/max, the first two moments (count, mean and sum of squared deviations) and a t-digest
+    for quantiles. Profiles of disjoint chunks merge into the profile of their union, so the raw export
+    never has to fit in memory.
+    """
+
+    def __init__(self, numeric: bool):
+        self.numeric = numeric
+        self.rows = 0
+        self.nulls = 0
+        self.distinct = HyperLogLog()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.digest = TDigest() if numeric else None
+
+    def update(self, values: pd.Series) -> 'ColumnProfile':
+        """Adds a chunk of the column to the profile."""
+        chunk = ColumnProfile(self.numeric)
+        chunk.rows = len(values)
+        chunk.nulls = int(values.isna().sum())
+        chunk.distinct.update(values)
+
+        if self.numeric:
+            data = values.dropna().to_numpy(dtype='float64')
+            if len(data):
+                chunk.count = len(data)
+                chunk.mean = float(data.mean())
+                chunk.m2 = float(((data - chunk.mean) ** 2).sum())
+                chunk.min = float(data.min())
+                chunk.max = float(data.max())
+                chunk.digest = TDigest.from_values(data)
+
+        merged = self.merge(chunk)
+        self.__dict__.update(merged.__dict__)
+        return self
+
+    def merge(self, other: 'ColumnProfile') -> 'ColumnProfile':
+        """Returns the profile of both columns concatenated (Chan et al. update for the moments)."""
+        merged = ColumnProfile(self.numeric)
+        merged.rows = self.rows + other.rows
+        merged.nulls = self.nulls + other.nulls
+        merged.distinct = self.distinct.merge(other.distinct)
+
+        merged.count = self.count + other.count
+        if merged.count:
+            delta = other.mean - self.mean
+            merged.mean = self.mean + delta * other.count / merged.count
+            merged.m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / merged.count
+        merged.min = min((v for v in (self.min, other.min) if v is not None), default=None)
+        merged.max = max((v for v in (self.max, other.max) if v is not None), default=None)
+        if self.numeric:
+            merged.digest = self.digest.merge(other.digest)
+        return merged
+
+    @property
+    def non_null(self) -> int:
+        return self.rows - self.nulls
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation, as DataFrame.describe reports it."""
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else float('nan')
+
+    def to_dict(self) -> dict:
+        return {
+            'numeric': self.numeric,
+            'rows': self.rows,
+            'nulls': self.nulls,
+            'distinct': self.distinct.to_dict(),
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.min,
+            'max': self.max,
+            'digest': self.digest.to_dict() if self.digest is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ColumnProfile':
+        profile = cls(data['numeric'])
+        for key in ('rows', 'nulls', 'count', 'mean', 'm2', 'min', 'max'):
+            setattr(profile, key, data[key])
+        profile.distinct = HyperLogLog.from_dict(data['distinct'])
+        profile.digest = TDigest.from_dict(data['digest']) if data['digest'] is not None else None
+        return profile
+
+
+class DatasetProfile:
+    """Profiles of every column of a dataset, built chunk by chunk with update() or at once with from_frame()."""
+
+    def __init__(self, columns: dict[str, ColumnProfile] | None = None):
+        self.columns = columns or {}
+
+    def update(self, df: pd.DataFrame) -> 'DatasetProfile':
+        """Adds a chunk of rows to the profile."""
+        for name in df.columns:
+            if name not in self.columns:
+                dtype = df[name].dtype
+                numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+                self.columns[name] = ColumnProfile(numeric)
+            self.columns[name].update(df[name])
+        return self
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, chunksize: int = 1_000_000) -> 'DatasetProfile':
+        """Profiles df in slices of chunksize rows."""
+        profile = cls()
+        for start in range(0, max(len(df), 1), chunksize):
+            profile.update(df.iloc[start:start + chunksize])
+        return profile
+
+    def merge(self, other: 'DatasetProfile') -> 'DatasetProfile':
+        """Returns the profile of both datasets concatenated."""
+        names = list(self.columns) + [name for name in other.columns if name not in self.columns]
+        return DatasetProfile({
+            name: self.columns[name].merge(other.columns[name]) if name in self.columns and name in other.columns
+            else self.columns.get(name) or other.columns[name]
+            for name in names
+        })
+
+    @property
+    def rows(self) -> int:
+        return next(iter(self.columns.values())).rows if self.columns else 0
+
+    def describe(self, variable: str) -> pd.Series:
+        """
+        Returns the same statistics as DataFrame.describe for a numeric column. The quartiles are t-digest
+        estimates; the other statistics are exact.
+        """
+        column = self.columns[variable]
+        q25, q50, q75 = column.digest.quantile([0.25, 0.5, 0.75])
+        return pd.Series(
+            [column.count, column.mean, column.std, column.min, q25, q50, q75, column.max],
+            index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+            name=variable
+        )
+
+    def to_dict(self) -> dict:
+        return {name: column.to_dict() for name, column in self.columns.items()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DatasetProfile':
+        return cls({name: ColumnProfile.from_dict(column) for name, column in data.items()})
@@ -0,0 +1,239 @@
+import contextvars
+import logging
+import os
+import threading
+import pandas as pd
+
+from functools import cached_property
+from definitions import SHARED_DATA
+from .aggregation import with_codes
+from .cube import YearCube
+from .quantile_cube import QuantileCube
+from .indexes import FilteredView, MunicipalityIndex
+from .rankings import RegionRankings
+from .data_profile import DatasetProfile
+from .load_data import DIMENSION_COLUMNS, delta_paths, load_data, load_profiles, merge_delta, source_changed
+from .shared_frame import load_shared
+
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """
+    One version of the dataset and the structures derived from it, each built on first use.
+    A snapshot never changes once created; refreshing the data creates a new one.
+    """
+
+    def __init__(self, frame: pd.DataFrame, profiles: tuple[DatasetProfile, DatasetProfile | None] | None = None):
+        self.frame = frame
+        if profiles is not None:
+            self.profiles = profiles
+
+    @property
+    def version(self) -> str:
+        """Identifier of the data, derived from the source file fingerprint and the deltas applied."""
+        return self.frame.attrs.get('version', 'unversioned')
+
+    @property
+    def deltas(self) -> list[str]:
+        """File names of the delta CSVs folded into this snapshot, in order."""
+        return self.frame.attrs.get('deltas', [])
+
+    @cached_property
+    def profiles(self) -> tuple[DatasetProfile, DatasetProfile | None]:
+        return load_profiles(self.frame)
+
+    @cached_property
+    def coded(self) -> pd.DataFrame:
+        return with_codes(self.frame, DIMENSION_COLUMNS)
+
+    @cached_property
+    def cube(self) -> YearCube:
+        return YearCube(self.coded)
+
+    @cached_property
+    def quantiles(self) -> QuantileCube:
+        return QuantileCube(self.coded)
+
+    @cached_property
+    def view(self) -> FilteredView:
+        return FilteredView.build(self.coded)
+
+    @cached_property
+    def municipalities(self) -> MunicipalityIndex:
+        return MunicipalityIndex(self.coded)
+
+    @cached_property
+    def rankings(self) -> RegionRankings:
+        return RegionRankings(self.coded)
+
+    def warm(self) -> 'Snapshot':
+        """
+        Builds the derived structures now instead of on first use, e.g. before forking processes that
+        should inherit them rather than build their own.
+        """
+        for name in ('coded', 'cube', 'quantiles', 'view', 'municipalities', 'rankings'):
+            getattr(self, name)
+        return self
+
+    def with_deltas(self, paths: list[str]) -> 'Snapshot':
+        """Returns a new snapshot with the delta CSVs folded in, merging their raw profiles into this one's."""
+        if not paths:
+            return self
+        frame, raw_profile = self.frame, self.profiles[1]
+        for path in paths:
+            delta_profile = DatasetProfile()
+            frame = merge_delta(frame, path, delta_profile)
+            raw_profile = raw_profile.merge(delta_profile) if raw_profile is not None else None
+        return Snapshot(frame, (DatasetProfile.from_frame(frame), raw_profile))
+
+
+class Dataset:
+    """
+    Handle to the preprocessed dataset. Nothing is read from disk until the frame is first requested,
+    so importing the app, the pages or the analysis functions does not need the data file.
+
+    The data lives in a Snapshot that refresh() replaces atomically. A request pinned with pin() keeps
+    reading the snapshot it started with, so a refresh never mixes two versions within one response.
+    """
+
+    def __init__(self, loader=load_data):
+        self._loader = loader
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._pinned = contextvars.ContextVar('dataset_snapshot', default=None)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def current(self) -> Snapshot:
+        """Returns the latest snapshot, loading the export and any pending deltas on first access."""
+        if self._snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = Snapshot(self._loader()).with_deltas(delta_paths())
+        return self._snapshot
+
+    @property
+    def snapshot(self) -> Snapshot:
+        """Returns the snapshot pinned to the current request, or the latest one outside of a request."""
+        pinned = self._pinned.get()
+        if pinned is None:
+            return self.current()
+        if not pinned:
+            pinned.append(self.current())
+        return pinned[0]
+
+    def pin(self) -> contextvars.Token:
+        """Pins the current context (a request) to the snapshot it reads first; undo with unpin(token)."""
+        return self._pinned.set([])
+
+    def unpin(self, token: contextvars.Token) -> None:
+        self._pinned.reset(token)
+
+    def refresh(self) -> bool:
+        """
+        Picks up a changed export (full reload) or new delta CSVs (merged into the current aggregate) and
+        swaps in the resulting snapshot. Returns True when a new snapshot was installed. An export that was
+        only touched (same content hash) keeps the current snapshot and just takes its new fingerprint.
+        """
+        with self._lock:
+            current = self._snapshot
+            if current is None:
+                return False
+
+            paths = delta_paths()
+            names = [os.path.basename(path) for path in paths]
+            applied = current.deltas
+            fingerprint = current.frame.attrs.get('fingerprint', {})
+
+            if source_changed(fingerprint) or names[:len(applied)] != applied:
+                # New export, or deltas removed or reordered: rebuild from the export on disk
+                if hasattr(self._loader, 'cache_clear'):
+                    self._loader.cache_clear()
+                frame = self._loader()
+                reloaded = frame.attrs.get('fingerprint', {})
+                if names == applied and 'sha256' in reloaded and reloaded.get('sha256') == fingerprint.get('sha256'):
+                    current.frame.attrs['fingerprint'] = reloaded
+                    return False
+                snapshot = Snapshot(frame).with_deltas(paths)
+            elif len(names) > len(applied):
+                snapshot = current.with_deltas(paths[len(applied):])
+            else:
+                return False
+
+            self._snapshot = snapshot
+
+        logger.info("Dataset refreshed: %s -> %s", current.version, snapshot.version)
+        return True
+
+    def warm(self) -> Snapshot:
+        """Loads the dataset if needed and builds the derived structures of the snapshot in use (Snapshot.warm)."""
+        return self.snapshot.warm()
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Returns the dataset, loading it on first access."""
+        return self.snapshot.frame
+
+    @property
+    def coded(self) -> pd.DataFrame:
+        """
+        The frame with its dimension columns as categoricals, factorized once per snapshot, for the
+        group-bys of the analysis functions (see common/aggregation.py). Numeric columns are shared.
+        """
+        return self.snapshot.coded
+
+    @property
+    def version(self) -> str:
+        """Identifier of the loaded data, derived from the source file fingerprint (see load_data)."""
+        return self.snapshot.version
+
+    @property
+    def profiles(self) -> tuple[DatasetProfile, DatasetProfile | None]:
+        return self.snapshot.profiles
+
+    @property
+    def profile(self) -> DatasetProfile:
+        """Column profile of the dataset (counts, distinct counts, moments), computed during ingest."""
+        return self.profiles[0]
+
+    @property
+    def raw_profile(self) -> DatasetProfile | None:
+        """Column profile of the raw CSV rows, before filtering and aggregation, when available."""
+        return self.profiles[1]
+
+    @property
+    def cube(self) -> YearCube:
+        """Yearly totals by department, municipality and program, built once per snapshot."""
+        return self.snapshot.cube
+
+    @property
+    def quantiles(self) -> QuantileCube:
+        """t-digests of the numeric measures by department, program and year, built once per snapshot."""
+        return self.snapshot.quantiles
+
+    @property
+    def view(self) -> FilteredView:
+        """View over all rows with value -> position indexes for departamento, municipio and programa."""
+        return self.snapshot.view
+
+    @property
+    def municipalities(self) -> MunicipalityIndex:
+        """Municipality names by department, searchable for the dropdown options."""
+        return self.snapshot.municipalities
+
+    @property
+    def rankings(self) -> RegionRankings:
+        """Departments ranked by each measure within every program, built once per snapshot."""
+        return self.snapshot.rankings
+
+
+dataset = Dataset(load_shared if SHARED_DATA else load_data)
+
+
+def get_df() -> pd.DataFrame:
+    """Returns the preprocessed dataset, loading it on first use."""
+    return dataset.frame
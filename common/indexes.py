@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import unicodedata
+
+
+INDEXED_DIMENSIONS = ['departamento', 'municipio', 'programa']
+
+
+def build_postings(df: pd.DataFrame, dimensions: list[str] = INDEXED_DIMENSIONS) -> dict[str, dict]:
+    """
+    Returns, for every dimension, a mapping from each value to the sorted row positions holding it.
+    The position arrays are slices of one argsort per dimension, so they share memory.
+    """
+    postings = {}
+    for dim in dimensions:
+        codes, uniques = pd.factorize(df[dim])
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        bounds = np.concatenate([[0], np.cumsum(counts)]) + np.count_nonzero(codes < 0)
+        postings[dim] = {
+            value: order[bounds[code]:bounds[code + 1]]
+            for code, value in enumerate(uniques)
+        }
+    return postings
+
+
+class FilteredView:
+    """
+    Rows of a frame selected by position through inverted dimension indexes.
+
+    Narrowing a view with `where` only unions and intersects sorted position arrays; no boolean mask
+    over the whole frame is allocated and no rows are copied until `column` or `to_frame` reads them.
+    """
+
+    def __init__(self, frame: pd.DataFrame, postings: dict[str, dict], positions: np.ndarray | None = None):
+        self.source = frame
+        self.postings = postings
+        # None means every row of the source frame
+        self.positions = positions
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame, dimensions: list[str] = INDEXED_DIMENSIONS) -> 'FilteredView':
+        """Indexes the dimensions of frame and returns a view over all of its rows."""
+        return cls(frame, build_postings(frame, dimensions))
+
+    def __len__(self) -> int:
+        return len(self.source) if self.positions is None else len(self.positions)
+
+    def _matching(self, dim: str, values) -> np.ndarray:
+        index = self.postings[dim]
+        found = [index[value] for value in values if value in index]
+        if not found:
+            return np.empty(0, dtype='int64')
+        if len(found) == 1:
+            return found[0]
+        return np.sort(np.concatenate(found))
+
+    def where(self, **filters: list) -> 'FilteredView':
+        """
+        Returns the rows whose dimension values are in the given lists, e.g. where(departamento=['ANTIOQUIA']).
+        Empty or None lists do not filter.
+        """
+        positions = self.positions
+        for dim, values in filters.items():
+            if not values:
+                continue
+            matching = self._matching(dim, values)
+            positions = matching if positions is None else np.intersect1d(positions, matching, assume_unique=True)
+        return FilteredView(self.source, self.postings, positions)
+
+    def groups(self, dim: str):
+        """Yields (value, view) for every value of an indexed dimension present in this view."""
+        for value in self.postings[dim]:
+            view = self.where(**{dim: [value]})
+            if len(view):
+                yield value, view
+
+    def column(self, name: str) -> pd.Series:
+        """Returns one column restricted to the rows of the view."""
+        column = self.source[name]
+        return column if self.positions is None else column.take(self.positions)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns the rows of the view as a DataFrame, copying only the selected rows."""
+        return self.source if self.positions is None else self.source.take(self.positions)
+
+
+def as_frame(data: pd.DataFrame | FilteredView) -> pd.DataFrame:
+    """Returns data as a DataFrame, materializing it if it is a FilteredView."""
+    return data.to_frame() if isinstance(data, FilteredView) else data
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases text and strips accents, so 'bogota' matches 'BOGOTÁ, D.C.'."""
+    return unicodedata.normalize('NFKD', str(text)).encode('ascii', errors='ignore').decode('ascii').lower()
+
+
+class MunicipalityIndex:
+    """
+    Municipality names by department, with accent-insensitive search. Built once per dataset so the
+    municipality dropdown can load its options on demand instead of embedding the national list.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        pairs = df[['departamento', 'municipio']].drop_duplicates()
+        self.by_department = {
+            str(dept): sorted(map(str, group['municipio'].unique()))
+            for dept, group in pairs.groupby('departamento', observed=True)
+        }
+        self.municipalities = sorted(map(str, pairs['municipio'].unique()))
+        self.normalized = {name: normalize_text(name) for name in self.municipalities}
+
+    def search(self, text: str, departments: list[str], limit: int) -> list[str]:
+        """
+        Returns up to limit municipality names containing text, restricted to the given departments
+        (all of them when the list is empty). Names starting with text come first.
+        """
+        if departments:
+            candidates = sorted({name for dept in departments for name in self.by_department.get(dept, [])})
+        else:
+            candidates = self.municipalities
+
+        needle = normalize_text(text.strip()) if text else ''
+        if not needle:
+            return candidates[:limit]
+
+        prefix, contains = [], []
+        for name in candidates:
+            position = self.normalized[name].find(needle)
+            if position == 0:
+                prefix.append(name)
+            elif position > 0:
+                contains.append(name)
+            if len(prefix) >= limit:
+                break
+
+        return (prefix + contains)[:limit]
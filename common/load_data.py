@@ -1,9 +1,27 @@
+import hashlib
 import json
+import logging
 import pandas as pd
 import os
+import tempfile
 
 from functools import cache
-from definitions import FILE_NAME, ROOT_DIR
+from .aggregation import group_sums
+from .data_profile import DatasetProfile
+from definitions import CACHE_FILE_NAME, COMPACT_DTYPES, DELTA_DIR, FILE_NAME, INGEST_CHUNKSIZE, ROOT_DIR, USE_DATA_CACHE
+
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the preprocessing below or the stored profile format changes so stale caches are rebuilt
+PIPELINE_VERSION = 2
+CACHE_METADATA_KEY = b'subsidios_fingerprint'
+PROFILE_METADATA_KEY = b'subsidios_profile'
+
+GROUP_KEYS = ['ano_de_asignacion', 'departamento', 'municipio', 'programa', 'estado_de_postulacion']
+SUM_COLUMNS = ['valor_asignado', 'hogares']
+DIMENSION_COLUMNS = ['departamento', 'municipio', 'programa', 'estado_de_postulacion']
+NUMERIC_COLUMNS = ['ano_de_asignacion', 'hogares', 'valor_asignado', 'valor_por_hogar']
 
 
 def load_json(file_name: str) -> dict:
@@ -13,7 +31,7 @@ def load_json(file_name: str) -> dict:
 
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"JSON file {file_path} not found")
-    
+
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
@@ -25,27 +43,349 @@ def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dataset_version(fingerprint: dict, compact: bool = False) -> str:
+    """Returns a short identifier of a dataset built from a source file with the given fingerprint."""
+    version = f"v{fingerprint['pipeline_version']}-{fingerprint['sha256'][:16]}"
+    return f"{version}-compact" if compact else version
+
+
+def file_fingerprint(file_path: str) -> dict:
+    """Return the size, modification time and content hash of a file."""
+    stat = os.stat(file_path)
+    return {
+        'pipeline_version': PIPELINE_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': hash_file(file_path),
+    }
+
+
+def read_cache(cache_path: str, data_path: str) -> pd.DataFrame | None:
+    """
+    Returns the cached dataset if its fingerprint still matches the source file, None otherwise.
+    The content hash is only recomputed when the size matches but the modification time does not; if the
+    content is unchanged (the file was touched or copied), the cache is rewritten with the new modification
+    time so that source_changed() holds no longer and the next read skips the hash.
+    """
+    import pyarrow.parquet as pq
+
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+        cached = json.loads(metadata[CACHE_METADATA_KEY])
+    except (OSError, KeyError, ValueError) as error:
+        logger.warning("Ignoring unreadable data cache %s: %s", cache_path, error)
+        return None
+
+    stat = os.stat(data_path)
+    if cached.get('pipeline_version') != PIPELINE_VERSION or cached.get('size') != stat.st_size:
+        return None
+
+    touched = cached.get('mtime_ns') != stat.st_mtime_ns
+    if touched and cached.get('sha256') != hash_file(data_path):
+        return None
+
+    df = pd.read_parquet(cache_path)
+    if touched:
+        cached = {**cached, 'mtime_ns': stat.st_mtime_ns}
+        profiles = json.loads(metadata[PROFILE_METADATA_KEY]) if PROFILE_METADATA_KEY in metadata else None
+        write_cache(df, cache_path, cached, profiles)
+    df.attrs['fingerprint'] = cached
+    return df
+
+
+def read_cached_profiles(cache_path: str, fingerprint: dict) -> dict | None:
+    """
+    Returns the column profiles stored with the cached dataset ({'dataset': ..., 'raw': ...}), or None
+    if the cache is missing or was built from a different source file.
+    """
+    import pyarrow.parquet as pq
+
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+        cached = json.loads(metadata[CACHE_METADATA_KEY])
+        profiles = json.loads(metadata[PROFILE_METADATA_KEY])
+    except (OSError, KeyError, ValueError):
+        return None
+
+    if cached.get('sha256') != fingerprint.get('sha256') or cached.get('pipeline_version') != PIPELINE_VERSION:
+        return None
+    return profiles
+
+
+def default_mode(mode: int) -> int:
+    """
+    Returns mode restricted by the process umask: the permissions open() would have given a new file.
+    Files made with tempfile are private (0600/0700) whatever the umask, so they are set to this before
+    being moved into place, or other service accounts could not read them.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return mode & ~umask
+
+
+def write_cache(df: pd.DataFrame, cache_path: str, fingerprint: dict, profiles: dict | None = None) -> None:
+    """Atomically write the dataset, its source fingerprint and its column profiles to a Parquet file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[CACHE_METADATA_KEY] = json.dumps(fingerprint).encode('utf-8')
+    if profiles is not None:
+        metadata[PROFILE_METADATA_KEY] = json.dumps(profiles).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+
+    # Several workers may rebuild at once; write to a temporary file and swap it in
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            pq.write_table(table, file)
+        os.chmod(tmp_path, default_mode(0o666))
+        os.replace(tmp_path, cache_path)
+    except OSError as error:
+        logger.warning("Could not write data cache %s: %s", cache_path, error)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def source_columns(data_path: str) -> list[str]:
+    """Returns the raw CSV column names needed by the preprocessing, matched on their cleaned names."""
+    header = pd.read_csv(data_path, encoding='utf-8', nrows=0)
+    raw_columns = list(header.columns)
+    wanted = set(GROUP_KEYS + SUM_COLUMNS)
+    return [raw for raw, clean in zip(raw_columns, clean_column_names(header).columns) if clean in wanted]
+
+
+def aggregate_assigned(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep the assigned subsidies and sum values and households by year, region and program."""
+
+    df = df.loc[df['estado_de_postulacion'] == 'Asignados']
+
+    return group_sums(df, GROUP_KEYS, SUM_COLUMNS)
+
+
+def aggregate_in_chunks(data_path: str, chunksize: int, raw_profile: DatasetProfile | None = None) -> pd.DataFrame:
+    """
+    Streams the raw CSV in chunks of chunksize rows and folds them into a running aggregate.
+    Partial aggregates are buffered until they add up to chunksize rows, so peak memory stays bounded
+    by about two chunks plus the aggregate instead of the whole file. Each raw chunk is also added to
+    raw_profile when one is given.
+    """
+    aggregate = None
+    pending, pending_rows = [], 0
+
+    def fold(frames: list[pd.DataFrame]) -> pd.DataFrame:
+        frames = [frame for frame in frames if frame is not None]
+        return group_sums(pd.concat(frames, ignore_index=True), GROUP_KEYS, SUM_COLUMNS)
+
+    with pd.read_csv(data_path, encoding='utf-8', usecols=source_columns(data_path), chunksize=chunksize) as reader:
+        for chunk in reader:
+            chunk = clean_column_names(chunk)
+            if raw_profile is not None:
+                raw_profile.update(chunk)
+            partial = aggregate_assigned(chunk)
+            pending.append(partial)
+            pending_rows += len(partial)
+            if pending_rows >= chunksize:
+                aggregate = fold([aggregate, *pending])
+                pending, pending_rows = [], 0
+
+    if pending:
+        aggregate = fold([aggregate, *pending])
+
+    if aggregate is None:
+        raise ValueError(f"Data file {data_path} has no rows")
+
+    return aggregate
+
+
+def preprocess_data(
+    data_path: str,
+    chunksize: int = INGEST_CHUNKSIZE,
+    raw_profile: DatasetProfile | None = None
+) -> pd.DataFrame:
+    """
+    Read the raw CSV and aggregate the assigned subsidies by year, region and program.
+    A positive chunksize streams the file instead of reading it whole (see aggregate_in_chunks).
+    When raw_profile is given, the raw rows are profiled on the way.
+    """
+
+    if chunksize and chunksize > 0:
+        df = aggregate_in_chunks(data_path, chunksize, raw_profile)
+    else:
+        df = clean_column_names(pd.read_csv(data_path, encoding='utf-8', usecols=source_columns(data_path)))
+        if raw_profile is not None:
+            raw_profile.update(df)
+        df = aggregate_assigned(df)
+
+    df['valor_por_hogar'] = df['valor_asignado'] / df['hogares']
+
+    return df
+
+
+def delta_paths(delta_dir: str = DELTA_DIR) -> list[str]:
+    """Returns the delta CSV files waiting in delta_dir, in the order they are applied (by file name)."""
+    if not os.path.isdir(delta_dir):
+        return []
+    return [os.path.join(delta_dir, name) for name in sorted(os.listdir(delta_dir)) if name.endswith('.csv')]
+
+
+def source_changed(fingerprint: dict) -> bool:
+    """Returns True when the export on disk no longer has the size and modification time in fingerprint."""
+    try:
+        stat = os.stat(os.path.join(ROOT_DIR, 'data', FILE_NAME))
+    except OSError:
+        return False
+    return (stat.st_size, stat.st_mtime_ns) != (fingerprint.get('size'), fingerprint.get('mtime_ns'))
+
+
+def touched_fingerprint(fingerprint: dict) -> dict | None:
+    """
+    Returns fingerprint with the modification time of the export on disk if only that changed (the file
+    was touched or copied, its size and content hash are the same), None otherwise. Hashes the export.
+    """
+    data_path = os.path.join(ROOT_DIR, 'data', FILE_NAME)
+    try:
+        current = file_fingerprint(data_path)
+    except OSError:
+        return None
+    if any(current[key] != fingerprint.get(key) for key in ('pipeline_version', 'size', 'sha256')):
+        return None
+    return {**fingerprint, 'mtime_ns': current['mtime_ns']}
+
+
+def merge_delta(df: pd.DataFrame, delta_path: str, raw_profile: DatasetProfile | None = None) -> pd.DataFrame:
+    """
+    Returns the aggregated dataset df with the assigned rows of a delta CSV folded in. Only the delta is
+    read and aggregated; it is then summed into the existing groups, so the export is not reprocessed.
+    The version in attrs is chained with the delta's hash, so every worker applying the same deltas in
+    the same order ends up with the same version. The raw delta rows are added to raw_profile if given.
+    """
+    compact = isinstance(df['departamento'].dtype, pd.CategoricalDtype)
+    delta = preprocess_data(delta_path, 0, raw_profile)
+
+    merged = group_sums(pd.concat(
+        [df[GROUP_KEYS + SUM_COLUMNS].astype({column: 'object' for column in DIMENSION_COLUMNS}), delta[GROUP_KEYS + SUM_COLUMNS]],
+        ignore_index=True
+    ), GROUP_KEYS, SUM_COLUMNS)
+    merged['valor_por_hogar'] = merged['valor_asignado'] / merged['hogares']
+
+    if compact:
+        merged = compact_dtypes(merged)
+
+    merged.attrs['fingerprint'] = df.attrs.get('fingerprint', {})
+    merged.attrs['version'] = f"{df.attrs.get('version', 'unversioned')}+{hash_file(delta_path)[:8]}"
+    merged.attrs['deltas'] = [*df.attrs.get('deltas', []), os.path.basename(delta_path)]
+    return merged
+
+
+def downcast_lossless(series: pd.Series) -> pd.Series:
+    """Downcast a numeric series to the smallest integer or float32 dtype that keeps every value."""
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series):
+        downcast = series.astype('float32')
+        if downcast.astype(series.dtype).equals(series):
+            return downcast
+    return series
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the dimension columns to categoricals and downcast the measures where lossless."""
+    df = df.copy()
+    for column in DIMENSION_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = downcast_lossless(df[column])
+    return df
+
+
+def memory_footprint(df: pd.DataFrame) -> int:
+    """Returns the memory used by the DataFrame in bytes, including Python string objects."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
 @cache
-def load_data() -> pd.DataFrame:
+def load_data(
+    use_cache: bool = USE_DATA_CACHE,
+    compact: bool = COMPACT_DTYPES,
+    chunksize: int = INGEST_CHUNKSIZE
+) -> pd.DataFrame:
+    """
+    Returns the preprocessed dataset. When use_cache is set, the result is read from (or stored to)
+    a Parquet file next to the CSV, keyed by the source file fingerprint and PIPELINE_VERSION.
+    When compact is set, the dimensions are categoricals and the measures are downcast (see compact_dtypes).
+    A positive chunksize streams the CSV on a cache miss, bounding peak memory (see aggregate_in_chunks).
+    The source fingerprint and the derived dataset version are kept in df.attrs.
+    """
+    df = _load_preprocessed(use_cache, chunksize)
+
+    if compact:
+        original_size = memory_footprint(df)
+        df = compact_dtypes(df)
+        logger.info(
+            "Compact dtypes: dataset footprint %.1f MB -> %.1f MB",
+            original_size / 1e6, memory_footprint(df) / 1e6
+        )
+
+    df.attrs['version'] = dataset_version(df.attrs['fingerprint'], compact)
+
+    return df
+
+
+def _load_preprocessed(use_cache: bool, chunksize: int) -> pd.DataFrame:
+    """Returns the preprocessed dataset, going through the Parquet cache when use_cache is set."""
 
     data_path = os.path.join(ROOT_DIR, 'data', FILE_NAME)
 
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"Data file {FILE_NAME} not found in {data_path}")
-    
-    df = pd.read_csv(data_path, encoding='utf-8')
-    df = clean_column_names(df)
 
-    df = df.loc[df['estado_de_postulacion'] == 'Asignados']
+    if not use_cache:
+        fingerprint = file_fingerprint(data_path)
+        df = preprocess_data(data_path, chunksize)
+        df.attrs['fingerprint'] = fingerprint
+        return df
 
-    df = df.groupby(['ano_de_asignacion', 'departamento', 'municipio', 'programa', 'estado_de_postulacion'], as_index=False).agg({
-        'valor_asignado': 'sum',
-        'hogares': 'sum'
-    })
+    cache_path = os.path.join(ROOT_DIR, 'data', CACHE_FILE_NAME)
+    df = read_cache(cache_path, data_path)
+    if df is not None:
+        return df
 
-    df['valor_por_hogar'] = df['valor_asignado'] / df['hogares']
+    # Fingerprint before parsing so a file replaced mid-build is not cached under the new hash
+    fingerprint = file_fingerprint(data_path)
+    raw_profile = DatasetProfile()
+    df = preprocess_data(data_path, chunksize, raw_profile)
+    profiles = {'dataset': DatasetProfile.from_frame(df).to_dict(), 'raw': raw_profile.to_dict()}
+    write_cache(df, cache_path, fingerprint, profiles)
+    df.attrs['fingerprint'] = fingerprint
 
     return df
 
 
-df = load_data()
\ No newline at end of file
+def load_profiles(df: pd.DataFrame) -> tuple[DatasetProfile, DatasetProfile | None]:
+    """
+    Returns the profiles of the dataset and of the raw rows it was built from. They are computed once
+    during ingest and stored in the Parquet cache; without a matching cache the dataset is profiled
+    now and the raw profile is not available.
+    """
+    cache_path = os.path.join(ROOT_DIR, 'data', CACHE_FILE_NAME)
+    profiles = read_cached_profiles(cache_path, df.attrs.get('fingerprint', {}))
+
+    if profiles is None:
+        return DatasetProfile.from_frame(df), None
+    return DatasetProfile.from_dict(profiles['dataset']), DatasetProfile.from_dict(profiles['raw'])
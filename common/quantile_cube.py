@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from .sketches import TDigest, compress_centroids
+
+
+DIMENSIONS = ['departamento', 'programa', 'ano_de_asignacion']
+MEASURES = ['hogares', 'valor_asignado', 'valor_por_hogar']
+
+
+class QuantileCube:
+    """
+    t-digest of hogares, valor_asignado and valor_por_hogar for every (departamento, programa,
+    ano_de_asignacion) cell.
+
+    For each measure the centroids of all cells live in flat arrays sorted by cell, next to the exact
+    per-cell count, minimum, maximum and sum of squared deviations. The distribution of any selection
+    of departments, programs and years is the merge of its cells' digests, which costs O(centroids in
+    the selected cells) and never reads the rows of the dataset.
+    """
+
+    def __init__(self, df: pd.DataFrame, compression: float = 100):
+        self.compression = compression
+
+        self.values = {}
+        dim_codes = []
+        for dim in DIMENSIONS:
+            codes, uniques = pd.factorize(df[dim], sort=True)
+            self.values[dim] = {value: code for code, value in enumerate(uniques)}
+            dim_codes.append(codes)
+
+        self.cell_codes, cell_ids = np.unique(np.stack(dim_codes, axis=1), axis=0, return_inverse=True)
+        cell_ids = cell_ids.ravel()
+        n_cells = len(self.cell_codes)
+
+        self.centroids = {}
+        self.cell_stats = {}
+        for measure in MEASURES:
+            values = df[measure].to_numpy(dtype='float64')
+            present = ~np.isnan(values)
+            values, cells = values[present], cell_ids[present]
+
+            means, weights, groups = compress_centroids(values, np.ones(len(values)), cells, compression)
+            self.centroids[measure] = (means, weights, groups)
+
+            counts = np.bincount(cells, minlength=n_cells).astype('float64')
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cell_means = np.bincount(cells, weights=values, minlength=n_cells) / counts
+            stats = pd.Series(values).groupby(cells).agg(['min', 'max']).reindex(range(n_cells))
+            self.cell_stats[measure] = {
+                'count': counts,
+                'mean': cell_means,
+                'm2': np.bincount(cells, weights=(values - cell_means[cells]) ** 2, minlength=n_cells),
+                'min': stats['min'].to_numpy(),
+                'max': stats['max'].to_numpy(),
+            }
+
+    def _cell_mask(self, filters: dict[str, list]) -> np.ndarray:
+        mask = np.ones(len(self.cell_codes), dtype=bool)
+        for dim, selected in filters.items():
+            if not selected:
+                continue
+            lookup = self.values[dim]
+            codes = [lookup[value] for value in selected if value in lookup]
+            mask &= np.isin(self.cell_codes[:, DIMENSIONS.index(dim)], codes)
+        return mask
+
+    def _merge(self, measure: str, mask: np.ndarray) -> TDigest:
+        stats = self.cell_stats[measure]
+        selected = mask & (stats['count'] > 0)
+        if not selected.any():
+            return TDigest(self.compression)
+
+        means, weights, groups = self.centroids[measure]
+        in_selection = selected[groups]
+        merged_means, merged_weights, _ = compress_centroids(
+            means[in_selection], weights[in_selection], np.zeros(in_selection.sum(), dtype='int64'), self.compression
+        )
+
+        counts, cell_means = stats['count'][selected], stats['mean'][selected]
+        mean = (counts * cell_means).sum() / counts.sum()
+        m2 = stats['m2'][selected].sum() + (counts * (cell_means - mean) ** 2).sum()
+        return TDigest(
+            self.compression, merged_means, merged_weights,
+            float(stats['min'][selected].min()), float(stats['max'][selected].max()), float(m2)
+        )
+
+    def digest(self, measure: str, **filters: list) -> TDigest:
+        """
+        Returns the digest of measure over the cells matching the filters, e.g.
+        digest('hogares', programa=['MI CASA YA']). Empty or None lists do not filter.
+        """
+        return self._merge(measure, self._cell_mask(filters))
+
+    def digests_by(self, dim: str, measure: str, **filters: list) -> dict:
+        """Returns {value: digest} for every value of dim with data in the selection, in sorted order."""
+        mask = self._cell_mask(filters) & (self.cell_stats[measure]['count'] > 0)
+        column = self.cell_codes[:, DIMENSIONS.index(dim)]
+        # A filter on dim itself restricts the values to merge, instead of testing every one of them
+        lookup = self.values[dim]
+        candidates = sorted(value for value in set(filters[dim]) if value in lookup) if filters.get(dim) else lookup
+        return {
+            value: self._merge(measure, mask & (column == lookup[value]))
+            for value in candidates
+            if (mask & (column == lookup[value])).any()
+        }
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from .aggregation import Grouping
+
+
+MEASURES = ['hogares', 'valor_asignado', 'valor_por_hogar']
+
+
+def summarization(variable: str) -> str:
+    """How departments are ranked by a variable: by its average for valor_por_hogar, by its total otherwise."""
+    return 'mean' if variable == 'valor_por_hogar' else 'sum'
+
+
+class RegionRankings:
+    """
+    Every department ranked by the sum of hogares and valor_asignado and the mean of valor_por_hogar,
+    within each program and over all programs, as rank_regions orders them.
+
+    For each measure the rankings of all programs live in two flat arrays (departments and scores) sorted
+    by program and then by rank, with the slice of each program kept aside. The ranking of any program
+    is built with two group-bys when the snapshot is first ranked, so the top k departments of a program
+    are an O(k) slice afterwards.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        by_program = Grouping.by(df, ['programa', 'departamento'])
+        overall = Grouping.by(df, 'departamento')
+
+        program_keys = by_program.keys()
+        programs = np.asarray(program_keys['programa'], dtype=object)
+        departments = np.asarray(program_keys['departamento'], dtype=object)
+        self.programs = list(pd.unique(programs))
+
+        # Groups come in (programa, departamento) order, so each program is one contiguous run of groups
+        starts = np.flatnonzero(np.r_[True, programs[1:] != programs[:-1]])[:len(programs)]
+        bounds = np.r_[starts, len(programs)]
+        self.slices = {program: (bounds[i], bounds[i + 1]) for i, program in enumerate(self.programs)}
+
+        self.rankings = {}
+        for measure in MEASURES:
+            scores = self._scores(by_program, df[measure], measure)
+            keyed = np.where(np.isnan(scores), np.inf, -scores)
+            order = np.lexsort((np.arange(len(scores)), keyed, np.repeat(np.arange(len(starts)), np.diff(bounds))))
+
+            overall_scores = self._scores(overall, df[measure], measure)
+            overall_order = overall.top_k(overall_scores, overall.n_groups)
+
+            self.rankings[measure] = {
+                'departments': departments[order],
+                'scores': scores[order],
+                'all_departments': np.asarray(overall.keys(overall_order)['departamento'], dtype=object),
+                'all_scores': overall_scores[overall_order],
+            }
+
+    @staticmethod
+    def _scores(grouping: Grouping, values: pd.Series, measure: str) -> np.ndarray:
+        return grouping.mean(values) if summarization(measure) == 'mean' else grouping.sum(values)
+
+    def top(self, variable: str, k: int, programa: str | None = None) -> pd.DataFrame:
+        """
+        Returns the k departments ranking first by the variable within programa (over all programs when
+        None), best first, like rank_regions: the departamento column and the 'sum' or 'mean' column.
+        """
+        if variable not in self.rankings:
+            raise ValueError(f"Variable '{variable}' not found in DataFrame.")
+
+        ranking = self.rankings[variable]
+        if programa is None:
+            departments, scores = ranking['all_departments'][:k], ranking['all_scores'][:k]
+        else:
+            start, stop = self.slices.get(programa, (0, 0))
+            stop = min(stop, start + k)
+            departments, scores = ranking['departments'][start:stop], ranking['scores'][start:stop]
+
+        return pd.DataFrame({'departamento': departments, summarization(variable): scores})
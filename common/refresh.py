@@ -0,0 +1,43 @@
+import logging
+import threading
+
+from definitions import REFRESH_INTERVAL
+from .dataset import Dataset, dataset
+
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshWatcher(threading.Thread):
+    """
+    Daemon thread that calls Dataset.refresh every `interval` seconds, so a new export or a delta CSV
+    dropped in the delta directory is picked up without restarting the process. Checks are a stat of
+    the export and a listing of the delta directory; nothing is read until something changed.
+    """
+
+    def __init__(self, target: Dataset, interval: float):
+        super().__init__(name='dataset-refresh', daemon=True)
+        self.target = target
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            if not self.target.is_loaded:
+                continue
+            try:
+                self.target.refresh()
+            except Exception:  # a bad delta must not stop the watcher; the current snapshot stays in place
+                logger.exception("Dataset refresh failed")
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+def start_watcher(interval: float = REFRESH_INTERVAL, target: Dataset = dataset) -> RefreshWatcher | None:
+    """Starts a refresh watcher when interval is positive (SUBSIDIOS_REFRESH_INTERVAL) and returns it."""
+    if interval <= 0:
+        return None
+    watcher = RefreshWatcher(target, interval)
+    watcher.start()
+    return watcher
@@ -0,0 +1,196 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+
+from collections import OrderedDict
+from definitions import CACHE_DIR, RESULT_CACHE, RESULT_CACHE_SIZE_LIMIT, ROOT_DIR
+from .dataset import dataset
+
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+def code_version(packages: tuple[str, ...] = ('common', 'pages')) -> str:
+    """Returns a hash of the source of the packages that produce cached results."""
+    digest = hashlib.sha256()
+    for package in packages:
+        directory = os.path.join(ROOT_DIR, package)
+        for file_name in sorted(os.listdir(directory)):
+            if file_name.endswith('.py'):
+                with open(os.path.join(directory, file_name), 'rb') as file:
+                    digest.update(file.read())
+    return digest.hexdigest()[:12]
+
+
+class DiskBackend:
+    """
+    SQLite-backed cache (diskcache) in a directory shared by every worker process on the host.
+    Entries are evicted least-recently-used once size_limit bytes are reached.
+    """
+
+    def __init__(self, directory: str, size_limit: int):
+        import diskcache
+
+        self.cache = diskcache.Cache(
+            directory,
+            size_limit=size_limit,
+            eviction_policy='least-recently-used',
+            statistics=1,
+        )
+
+    def get(self, key: str):
+        return self.cache.get(key, default=MISSING)
+
+    def set(self, key: str, value) -> None:
+        self.cache.set(key, value)
+
+    def stats(self) -> dict:
+        hits, misses = self.cache.stats()
+        return {'hits': hits, 'misses': misses, 'entries': len(self.cache), 'bytes': self.cache.volume()}
+
+    def clear(self) -> None:
+        self.cache.clear()
+        self.cache.stats(reset=True)
+
+
+class RedisBackend:
+    """
+    Cache on a Redis-compatible server. Eviction is left to the server (maxmemory-policy allkeys-lru);
+    hit and miss counters are kept on the server so they cover every worker.
+    """
+
+    def __init__(self, url: str, prefix: str = 'subsidios:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        payload = self.client.get(self.prefix + key)
+        self.client.incr(self.prefix + ('stats:hits' if payload is not None else 'stats:misses'))
+        return MISSING if payload is None else pickle.loads(payload)
+
+    def set(self, key: str, value) -> None:
+        self.client.set(self.prefix + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def stats(self) -> dict:
+        hits, misses = self.client.mget(self.prefix + 'stats:hits', self.prefix + 'stats:misses')
+        return {'hits': int(hits or 0), 'misses': int(misses or 0)}
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class MemoryBackend:
+    """In-process LRU cache holding up to max_entries results. Not shared between workers."""
+
+    def __init__(self, max_entries: int = 256):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def set(self, key: str, value) -> None:
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+class ResultCache:
+    """
+    Cache of analysis results keyed by function name, arguments, dataset version and code version, so
+    entries computed for an older export or by an older deploy are never served.
+    """
+
+    def __init__(self, backend=None, version=lambda: dataset.version, release: str | None = None):
+        self.backend = backend
+        self.version = version
+        self.release = release or code_version()
+
+    def key(self, name: str, args: tuple) -> str:
+        digest = hashlib.sha256(json.dumps(args, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return f"{name}:{self.version()}:{self.release}:{digest[:32]}"
+
+    def get_or_compute(self, name: str, args: tuple, compute):
+        """Returns the cached result for (name, args), calling compute() and storing its result on a miss."""
+        if self.backend is None:
+            return compute()
+
+        key = self.key(name, args)
+        try:
+            value = self.backend.get(key)
+        except Exception as error:  # a broken cache must not take the page down
+            logger.warning("Result cache read failed for %s: %s", key, error)
+            return compute()
+
+        if value is MISSING:
+            value = compute()
+            try:
+                self.backend.set(key, value)
+            except Exception as error:
+                logger.warning("Result cache write failed for %s: %s", key, error)
+        return value
+
+    def stats(self) -> dict:
+        return self.backend.stats() if self.backend is not None else {}
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+
+def create_backend(setting: str = RESULT_CACHE):
+    """Returns the backend named by SUBSIDIOS_RESULT_CACHE: 'disk', 'memory', 'none' or a redis:// URL."""
+    if setting in ('', 'none', 'off'):
+        return None
+    if setting == 'memory':
+        return MemoryBackend()
+    if setting.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(setting)
+    if setting == 'disk':
+        return DiskBackend(os.path.join(CACHE_DIR, 'results'), RESULT_CACHE_SIZE_LIMIT)
+    raise ValueError(f"Unsupported result cache setting: {setting}")
+
+
+result_cache = ResultCache(create_backend())
+
+
+def cached_result(func):
+    """
+    Caches the return value of func in the shared result cache. The arguments must be JSON-serializable
+    and the result picklable; the dataset is read inside func, so it is not part of the arguments.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        return result_cache.get_or_compute(name, args, lambda: func(*args))
+
+    return wrapper
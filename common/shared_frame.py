@@ -0,0 +1,159 @@
+"""
+The dataset as memory-mapped column files, shared read-only by every process on the host.
+
+publish_frame() writes one .npy file per column plus a manifest to a directory named after the dataset
+version. attach_frame() maps those files and wraps them in a DataFrame without copying, so the pages
+of the columns live once in the OS page cache whatever the number of gunicorn workers. Text columns are
+stored as categorical codes, since Python string objects cannot be shared; their categories are kept in
+the manifest.
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from definitions import SHARED_DATA_DIR
+from .load_data import default_mode, load_data, source_changed, touched_fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+SHARED_FORMAT = 1
+MANIFEST = 'manifest.json'
+CURRENT = 'current'
+
+
+def publish_frame(frame: pd.DataFrame, directory: str = SHARED_DATA_DIR) -> str:
+    """
+    Writes the columns of frame under directory/<version> and makes it the current one, replacing any
+    earlier version. Processes still mapping the files of an earlier version keep reading them until
+    they attach the new one. Returns the path of the version directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = frame.attrs.get('version', 'unversioned')
+    tmp_path = tempfile.mkdtemp(prefix=f".{version}-", dir=directory)
+
+    columns = []
+    for number, (name, series) in enumerate(frame.items()):
+        file_name = f"{number}.npy"
+        if isinstance(series.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(series.dtype):
+            categorical = pd.Categorical(series)
+            np.save(os.path.join(tmp_path, file_name), categorical.codes)
+            columns.append({
+                'name': name, 'file': file_name, 'kind': 'category',
+                'categories': categorical.categories.tolist(), 'ordered': bool(categorical.ordered),
+            })
+        else:
+            np.save(os.path.join(tmp_path, file_name), series.to_numpy())
+            columns.append({'name': name, 'file': file_name, 'kind': 'numeric'})
+
+    with open(os.path.join(tmp_path, MANIFEST), 'w', encoding='utf-8') as file:
+        json.dump({
+            'format': SHARED_FORMAT,
+            'rows': len(frame),
+            'version': version,
+            'fingerprint': frame.attrs.get('fingerprint', {}),
+            'columns': columns,
+        }, file)
+
+    # mkdtemp makes the directory private; workers running as another user must still map the columns
+    for name in os.listdir(tmp_path):
+        os.chmod(os.path.join(tmp_path, name), default_mode(0o666))
+    os.chmod(tmp_path, default_mode(0o777))
+
+    path = os.path.join(directory, version)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmp_path, path)
+
+    pointer = os.path.join(directory, f".{CURRENT}.tmp")
+    with open(pointer, 'w', encoding='utf-8') as file:
+        file.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT))
+
+    # Unlinking mapped files is safe on POSIX: the mappings stay valid until the processes drop them
+    for name in os.listdir(directory):
+        if name not in (version, CURRENT) and not name.startswith('.'):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return path
+
+
+def read_manifest(directory: str = SHARED_DATA_DIR) -> tuple[str, dict] | None:
+    """Returns the path and manifest of the current version in directory, or None when there is none."""
+    try:
+        with open(os.path.join(directory, CURRENT), encoding='utf-8') as file:
+            path = os.path.join(directory, file.read().strip())
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return (path, manifest) if manifest.get('format') == SHARED_FORMAT else None
+
+
+def update_fingerprint(path: str, manifest: dict, fingerprint: dict) -> dict:
+    """Atomically replaces the source fingerprint recorded in the manifest of the version in path."""
+    manifest = {**manifest, 'fingerprint': fingerprint}
+    tmp_path = os.path.join(path, f".{MANIFEST}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+    os.chmod(tmp_path, default_mode(0o666))
+    os.replace(tmp_path, os.path.join(path, MANIFEST))
+    return manifest
+
+
+def attach_frame(path: str, manifest: dict) -> pd.DataFrame:
+    """Returns a DataFrame whose columns are read-only views of the memory-mapped files in path."""
+    columns = {}
+    for column in manifest['columns']:
+        values = np.load(os.path.join(path, column['file']), mmap_mode='r')
+        if column['kind'] == 'category':
+            dtype = pd.CategoricalDtype(pd.Index(column['categories']), ordered=column['ordered'])
+            columns[column['name']] = pd.Series(pd.Categorical.from_codes(values, dtype=dtype, validate=False), copy=False)
+        else:
+            columns[column['name']] = pd.Series(values, copy=False)
+
+    frame = pd.DataFrame(columns, index=pd.RangeIndex(manifest['rows']), copy=False)
+    frame.attrs['fingerprint'] = manifest['fingerprint']
+    frame.attrs['version'] = manifest['version']
+    return frame
+
+
+def load_shared(directory: str = SHARED_DATA_DIR, loader=load_data) -> pd.DataFrame:
+    """
+    Returns the dataset attached from directory. When there is no published version, or the export on
+    disk changed since it was published, the first process to get here loads the dataset with loader
+    and publishes it while the others wait on a file lock, then everyone attaches the new version.
+    An export that was only touched (same content hash) is not republished: the published version just
+    records its new modification time.
+    """
+    current = read_manifest(directory)
+    if current is not None and not source_changed(current[1]['fingerprint']):
+        return attach_frame(*current)
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            current = read_manifest(directory)
+            if current is not None and source_changed(current[1]['fingerprint']):
+                fingerprint = touched_fingerprint(current[1]['fingerprint'])
+                if fingerprint is not None:
+                    current = (current[0], update_fingerprint(*current, fingerprint))
+            if current is None or source_changed(current[1]['fingerprint']):
+                if hasattr(loader, 'cache_clear'):
+                    loader.cache_clear()
+                path = publish_frame(loader(), directory)
+                # The private copy is no longer needed once the columns are on disk
+                if hasattr(loader, 'cache_clear'):
+                    loader.cache_clear()
+                logger.info("Shared dataset published to %s", path)
+                current = read_manifest(directory)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    return attach_frame(*current)
@@ -3,3 +3,74 @@ import os
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 FILE_NAME = 'subsidios_vivienda_asignados.csv'
+
+# Columnar cache of the preprocessed dataset, stored next to the CSV in data/
+CACHE_FILE_NAME = 'subsidios_vivienda_asignados.parquet'
+USE_DATA_CACHE = os.getenv('SUBSIDIOS_USE_DATA_CACHE', '1') != '0'
+
+# Opt-in compact representation: categorical dimensions and downcast measures
+COMPACT_DTYPES = os.getenv('SUBSIDIOS_COMPACT_DTYPES', '0') == '1'
+
+# Rows per chunk when streaming the raw CSV; 0 reads the whole file at once
+INGEST_CHUNKSIZE = int(os.getenv('SUBSIDIOS_INGEST_CHUNKSIZE', '0'))
+
+# Directory for caches shared by every worker process (results, background jobs, ...)
+CACHE_DIR = os.getenv('SUBSIDIOS_CACHE_DIR', os.path.join(ROOT_DIR, 'cache'))
+
+# Shared cache of analysis results: 'disk', 'memory', 'none' or a redis:// URL
+RESULT_CACHE = os.getenv('SUBSIDIOS_RESULT_CACHE', 'disk')
+RESULT_CACHE_SIZE_LIMIT = int(os.getenv('SUBSIDIOS_RESULT_CACHE_SIZE_LIMIT', str(256 * 1024 * 1024)))
+
+# Delta CSVs (same columns as the export) folded into the loaded dataset, in file name order
+DELTA_DIR = os.getenv('SUBSIDIOS_DELTA_DIR', os.path.join(ROOT_DIR, 'data', 'deltas'))
+
+# Seconds between checks for a new export or new delta files; 0 disables the refresh watcher
+REFRESH_INTERVAL = float(os.getenv('SUBSIDIOS_REFRESH_INTERVAL', '0'))
+
+# Serve the dataset from memory-mapped column files in SHARED_DATA_DIR, shared by every worker process on
+# the host instead of one private copy per worker (see common/shared_frame.py and gunicorn.conf.py)
+SHARED_DATA = os.getenv('SUBSIDIOS_SHARED_DATA', '0') == '1'
+SHARED_DATA_DIR = os.getenv('SUBSIDIOS_SHARED_DATA_DIR', os.path.join(CACHE_DIR, 'shared'))
+
+# JSON engine for figures and callback responses ('orjson', 'json' or 'auto', see plotly.io.json.config)
+JSON_ENGINE = os.getenv('SUBSIDIOS_JSON_ENGINE', 'orjson')
+
+# Compression of responses of at least COMPRESS_MIN_SIZE bytes, with the first algorithm the client accepts
+COMPRESS = os.getenv('SUBSIDIOS_COMPRESS', '1') != '0'
+COMPRESS_ALGORITHMS = os.getenv('SUBSIDIOS_COMPRESS_ALGORITHMS', 'br,gzip').split(',')
+COMPRESS_MIN_SIZE = int(os.getenv('SUBSIDIOS_COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_LEVEL = int(os.getenv('SUBSIDIOS_COMPRESS_LEVEL', '6'))
+COMPRESS_BR_LEVEL = int(os.getenv('SUBSIDIOS_COMPRESS_BR_LEVEL', '4'))
+
+# Per-request and per-callback Prometheus metrics at /metrics, plus Server-Timing headers
+METRICS = os.getenv('SUBSIDIOS_METRICS', '1') != '0'
+
+# Read-only JSON API under /api (see web/api.py); responses may be reused for API_MAX_AGE seconds
+API = os.getenv('SUBSIDIOS_API', '1') != '0'
+API_MAX_AGE = int(os.getenv('SUBSIDIOS_API_MAX_AGE', '300'))
+
+# Rows serialized per block (CSV) or row group (Parquet) by the streaming downloads of web/export.py
+EXPORT_CHUNK_ROWS = int(os.getenv('SUBSIDIOS_EXPORT_CHUNK_ROWS', '50000'))
+
+# cProfile + tracemalloc profiles of callback requests: all of them (SUBSIDIOS_PROFILE=1), or only those
+# sending the header X-Subsidios-Profile with this token. Kept in SUBSIDIOS_PROFILE_DIR, newest first
+PROFILE_ALL = os.getenv('SUBSIDIOS_PROFILE', '0') == '1'
+PROFILE_TOKEN = os.getenv('SUBSIDIOS_PROFILE_TOKEN', '')
+PROFILE_DIR = os.getenv('SUBSIDIOS_PROFILE_DIR', os.path.join(CACHE_DIR, 'profiles'))
+PROFILE_KEEP = int(os.getenv('SUBSIDIOS_PROFILE_KEEP', '50'))
+
+# Callbacks (module.function, comma separated) run as background jobs in a separate process instead of in
+# the request, so a slow filter combination does not hold a worker; see common/background.py. None by
+# default: a job costs a fork and the browser's polling, which only pays off for a callback measured as slow
+BACKGROUND_CALLBACKS = [
+    name.strip() for name in os.getenv('SUBSIDIOS_BACKGROUND_CALLBACKS', '').split(',') if name.strip()
+]
+BACKGROUND_DIR = os.getenv('SUBSIDIOS_BACKGROUND_DIR', os.path.join(CACHE_DIR, 'jobs'))
+# Milliseconds between the browser's checks on a running job
+BACKGROUND_INTERVAL = int(os.getenv('SUBSIDIOS_BACKGROUND_INTERVAL', '250'))
+
+# Prebuild the static figures and tables into the result cache when the app starts (see warmup.py)
+WARMUP = os.getenv('SUBSIDIOS_WARMUP', '0') == '1'
+
+# Maximum number of options sent to the municipality dropdown per search
+MUNICIPALITY_OPTIONS_LIMIT = int(os.getenv('SUBSIDIOS_MUNICIPALITY_OPTIONS_LIMIT', '50'))
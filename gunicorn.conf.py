@@ -0,0 +1,57 @@
+"""
+Production settings for gunicorn:
+
+    gunicorn -c gunicorn.conf.py
+
+The master publishes the dataset as memory-mapped column files before forking (see
+common/shared_frame.py), and every worker attaches them read-only, so adding a worker does not add
+another copy of the data. Each worker imports the app itself and runs its own refresh watcher.
+"""
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+# Read by definitions.py, so it must be set before anything imports it
+os.environ.setdefault('SUBSIDIOS_SHARED_DATA', '1')
+# Read by prometheus_client when the workers import it: each worker writes its metrics there (web/metrics.py)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'subsidios-metrics'))
+
+wsgi_app = 'app:server'
+bind = os.getenv('SUBSIDIOS_BIND', f"0.0.0.0:{os.getenv('PORT', '8050')}")
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+threads = int(os.getenv('SUBSIDIOS_THREADS', '1'))
+timeout = int(os.getenv('SUBSIDIOS_TIMEOUT', '120'))
+# Workers import the app after forking; the data they share comes from the mapped files, not from the master
+preload_app = False
+
+
+def on_starting(server):
+    # Metric files of a previous run would be merged into this one's
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+    from definitions import SHARED_DATA
+    if SHARED_DATA:
+        from common.shared_frame import load_shared
+        frame = load_shared()
+        server.log.info("Shared dataset %s ready (%d rows)", frame.attrs['version'], len(frame))
+
+
+def when_ready(server):
+    from definitions import WARMUP
+    if WARMUP:
+        # In its own process: importing the app in the master would leave the workers a module (and a
+        # refresh watcher thread) that was set up before the fork. The workers serve meanwhile.
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'warmup.py')
+        server.log.info("Starting the result cache warmup (pid %d)", subprocess.Popen([sys.executable, script], cwd=os.path.dirname(script)).pid)
+
+
+def child_exit(server, worker):
+    # Drops the live gauges of the worker; its counters and histograms stay in the merged totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,9 +1,11 @@
 import dash
 import dash_bootstrap_components as dbc
 
-from dash import dcc, html, callback, Input, Output
+from dash import dcc, html, callback, clientside_callback, Input, Output, State
 from common import (
-    df,
+    cached_result,
+    dataset,
+    figure_payload,
     get_summary_statistics,
     graph_variable,
     load_json
@@ -71,13 +73,34 @@ text_component = dbc.Card(
     [
         dbc.CardHeader(html.H5("Explicación de la distribución")),
         dbc.CardBody(
-            html.Div(id='text-explanation', style={'marginTop': '20px'})
+            [
+                html.Div(id='text-explanation', style={'marginTop': '20px'}),
+                dcc.Store(id='text-explanation-store', data=explanation_text),
+            ]
         ),
     ],
     className="mb-3"
 )
 
 
+@cached_result
+def summary_statistics(selected_value: str):
+    """ Summary statistics of the selected variable, shared across workers through the result cache.
+    The page shows the whole dataset, whose rows are in memory, so the quartiles are exact rather than
+    read from the profile's t-digest.
+    """
+    return get_summary_statistics(dataset.coded, selected_value)
+
+
+@cached_result
+def variable_figure(selected_value: str, selected_label: str) -> dict:
+    """ Figure of the selected variable, shared across workers through the result cache.
+    Binned from the rows, so the histogram counts and the box are exact; t-digests are only used for
+    filtered selections (see QuantileCube).
+    """
+    return figure_payload(graph_variable(dataset.coded, selected_value, selected_label))
+
+
 @callback(
     Output('dd-output-container', 'children'),
     Input('dropdown', 'value')
@@ -85,7 +108,7 @@ text_component = dbc.Card(
 def build_table(selected_value: str):
     """ Builds a summary statistics table based on the selected variable from the dropdown.
     """
-    summary_df = get_summary_statistics(df, selected_value)
+    summary_df = summary_statistics(selected_value)
     return dbc.Table.from_dataframe(summary_df, striped=True, bordered=True, hover=True)
 
 
@@ -97,18 +120,20 @@ def build_graph(selected_value: str):
     """ Builds a graph based on the selected variable from the dropdown.
     """
     selected_label = next((opt["label"] for opt in dropdown_options if opt["value"] == selected_value), selected_value)
-    return graph_variable(df, selected_value, selected_label)
+    return variable_figure(selected_value, selected_label)
 
 
-@callback(
+# The explanations ship with the page in text-explanation-store, so looking one up runs in the browser
+clientside_callback(
+    """
+    function(selectedValue, explanations) {
+        return (explanations || {})[selectedValue] || "No hay explicación disponible para esta variable.";
+    }
+    """,
     Output('text-explanation', 'children'),
-    Input('dropdown', 'value')
+    Input('dropdown', 'value'),
+    State('text-explanation-store', 'data')
 )
-def get_text_explanation(selected_value: str):
-    """
-    Returns an explanation text based on the selected variable.
-    """
-    return explanation_text.get(selected_value, "No hay explicación disponible para esta variable.")
 
 
 layout = dbc.Container([
@@ -2,7 +2,7 @@ import dash
 import dash_bootstrap_components as dbc
 
 from dash import dcc, html, callback, Input, Output
-from common import get_summary_by_program, df
+from common import cached_result, dataset, get_summary_by_program
 
 
 dash.register_page(__name__, order=2, name="1ra. Pregunta")
@@ -31,6 +31,13 @@ text_component = dbc.Card(
 )
 
 
+@cached_result
+def summary_by_program():
+    """ Coverage by program, shared across workers through the result cache.
+    """
+    return get_summary_by_program(dataset.coded)
+
+
 @callback(
     Output('program-table-container', 'children'),
     Input('program-table-container', 'id')
@@ -41,7 +48,7 @@ def get_table(_):
     """
 
     return dbc.Table.from_dataframe(
-        get_summary_by_program(df),
+        summary_by_program(),
         striped=True,
         bordered=True,
         hover=True
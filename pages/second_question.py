@@ -1,8 +1,8 @@
 import dash
 import dash_bootstrap_components as dbc
 
-from dash import dcc, html, callback, Input, Output
-from common import df, top_5_regions, box_plots, load_json
+from dash import dcc, html, callback, clientside_callback, Input, Output, State
+from common import cached_result, dataset, figure_payload, box_plots, load_json
 
 
 dash.register_page(__name__, order=3, name="2da. Pregunta")
@@ -18,19 +18,51 @@ dropdown_options = [
 explanation_text = load_json('distribution_region_explanation.json')
 
 
-dropdown_component = dbc.InputGroup(
-    [
-        dcc.Dropdown(
-            options=dropdown_options,
-            value='hogares',  # Default value
-            id='dropdown_regions',
-            multi=False,
-            clearable=False,
-            style={"minWidth": "200px"}
-        ),
-    ],
-    className="mb-2"
-)
+# Points beyond the whiskers drawn per department; the boxes themselves are precomputed
+MAX_OUTLIERS = 50
+
+# Program shown first, and the number of departments drawn by default and at most
+DEFAULT_PROGRAM = 'MI CASA YA'
+DEFAULT_REGIONS = 5
+MAX_REGIONS = 15
+
+
+def build_controls() -> list[dbc.Col]:
+    """ Builds the program, variable and number-of-departments controls. Called when the page is
+    rendered, so the program options (read from the rankings) do not load the dataset at import.
+    """
+    programs = dataset.rankings.programs
+    program_dropdown = dcc.Dropdown(
+        options=[{"label": program, "value": program} for program in programs],
+        value=DEFAULT_PROGRAM if DEFAULT_PROGRAM in programs else next(iter(programs), None),
+        id='dropdown_program_regions',
+        multi=False,
+        clearable=False,
+        style={"minWidth": "200px"}
+    )
+
+    variable_dropdown = dcc.Dropdown(
+        options=dropdown_options,
+        value='hogares',  # Default value
+        id='dropdown_regions',
+        multi=False,
+        clearable=False,
+        style={"minWidth": "200px"}
+    )
+
+    regions_input = dbc.InputGroup(
+        [
+            dbc.InputGroupText("Departamentos"),
+            dbc.Input(id='input_regions_k', type='number', min=1, max=MAX_REGIONS, step=1, value=DEFAULT_REGIONS, debounce=True),
+        ],
+        size="sm"
+    )
+
+    return [
+        dbc.Col(program_dropdown, width=4),
+        dbc.Col(variable_dropdown, width=4),
+        dbc.Col(regions_input, width=2, className="d-flex align-items-center"),
+    ]
 
 
 graph_component = dcc.Graph(
@@ -47,7 +79,10 @@ text_component = dbc.Card(
     [
         dbc.CardHeader(html.H5("Explicación de la distribución por región")),
         dbc.CardBody(
-            html.Div(id='region-explanation', style={"textAlign": "justify"}),
+            [
+                html.Div(id='region-explanation', style={"textAlign": "justify"}),
+                dcc.Store(id='region-explanation-store', data=explanation_text),
+            ],
             style={"marginTop": "20px", "marginBottom": "20px"}
         ),
     ],
@@ -55,45 +90,63 @@ text_component = dbc.Card(
 )
 
 
+@cached_result
+def regions_figure(program: str, selected_value: str, k: int = DEFAULT_REGIONS) -> dict:
+    """ Box plots of the top k regions of a program, shared across workers through the result cache.
+    The departments come from the precomputed rankings and are drawn from their t-digests, so no rows are read.
+    """
+    top_regions = list(dataset.rankings.top(selected_value, k, program)['departamento'])
+    digests = dataset.quantiles.digests_by('departamento', selected_value, programa=[program], departamento=top_regions)
+
+    return figure_payload(box_plots(digests, selected_value, max_outliers=MAX_OUTLIERS, k=k))
+
+
 @callback(
     Output('graph-container-regions', 'figure'),
-    Input('dropdown_regions', 'value')
+    Input('dropdown_program_regions', 'value'),
+    Input('dropdown_regions', 'value'),
+    Input('input_regions_k', 'value')
 )
-def build_graph(selected_value: str):
-    """ Builds a graph showing the distribution of housing subsidies by region.
+def build_graph(program: str, selected_value: str, k: int | None):
+    """ Builds a graph showing the distribution of housing subsidies by region for the selected program.
     """
-    df_filtered = df.loc[df['programa'] == 'MI CASA YA']
-    top_regions = top_5_regions(df_filtered, selected_value)
-
-    return box_plots(top_regions, selected_value)
+    # The input is empty while being edited or out of range, so fall back to a valid count
+    k = min(max(int(k or DEFAULT_REGIONS), 1), MAX_REGIONS)
+    return regions_figure(program, selected_value, k)
 
 
-@callback(
+# The explanations ship with the page in region-explanation-store, so looking one up runs in the browser
+clientside_callback(
+    """
+    function(selectedValue, explanations) {
+        return (explanations || {})[selectedValue] || "No hay explicación disponible para esta variable.";
+    }
+    """,
     Output('region-explanation', 'children'),
-    Input('dropdown_regions', 'value')
+    Input('dropdown_regions', 'value'),
+    State('region-explanation-store', 'data')
 )
-def update_explanation(selected_value: str):
-    """ Updates the explanation text based on the selected variable.
+
+
+def layout(**kwargs):
+    """ Builds the page when it is requested, so the program options are not computed at import.
     """
-    return explanation_text.get(selected_value, "No hay explicación disponible para esta variable.")
-
-
-layout = dbc.Container([
-    dbc.Row([
-        dbc.Col(
-            html.Div([
-                html.H1("¿Cómo se distribuye el subsidio mi casa ya por región?", style={"textAlign": "center"}),
-            ])
-        )
-    ]),
-    dbc.Row([
-        dbc.Col(html.P("Seleccione una variable para visualizar su distribución por región:"), className="d-flex align-items-center justify-content-end"),
-        dbc.Col(dropdown_component, width=4, className="d-flex align-items-center justify-content-center"),
-    ], style={"marginTop": "5px", "marginBottom": "20px"}),
-    dbc.Row([
-        dbc.Col(graph_component, width=12, style={'height': 'auto'}),
-    ]),
-    dbc.Row([
-        dbc.Col(text_component, width=12, style={"marginTop": "20px", "marginBottom": "20px"})
-    ]),
-], fluid=True,)
\ No newline at end of file
+    return dbc.Container([
+        dbc.Row([
+            dbc.Col(
+                html.Div([
+                    html.H1("¿Cómo se distribuyen los subsidios por región?", style={"textAlign": "center"}),
+                ])
+            )
+        ]),
+        dbc.Row([
+            dbc.Col(html.P("Seleccione un programa, una variable y el número de departamentos a comparar:"), width=12),
+        ], style={"marginTop": "5px"}),
+        dbc.Row(build_controls(), className="mb-2", style={"marginBottom": "20px"}),
+        dbc.Row([
+            dbc.Col(graph_component, width=12, style={'height': 'auto'}),
+        ]),
+        dbc.Row([
+            dbc.Col(text_component, width=12, style={"marginTop": "20px", "marginBottom": "20px"})
+        ]),
+    ], fluid=True,)
@@ -1,56 +1,58 @@
 import dash
 import dash_bootstrap_components as dbc
 
-from dash import dcc, html, callback, Input, Output
-from common import get_lines_plots, df
+from dash import dcc, html, callback, clientside_callback, get_relative_path, Input, Output, State
+from common import cached_result, dataset, figure_payload, get_lines_plots, get_df
+from common.background import heavy_callback
+from definitions import MUNICIPALITY_OPTIONS_LIMIT
 
 
 dash.register_page(__name__, order=5, name="3ra. Pregunta")
 
 
-dropdown_depts_options = [
-    {"label": val, "value": val}
-    for val in df["departamento"].unique()
-]
-
-
-dropdown_mun_options = [
-    {"label": val, "value": val}
-    for val in df["municipio"].unique()
-]
+def build_dropdown_options(column: str) -> list[dict]:
+    """ Builds the dropdown options from the unique values of a dataset column.
+    """
+    return [
+        {"label": val, "value": val}
+        for val in get_df()[column].unique()
+    ]
 
 
-dropdown_programs_options = [
-    {"label": val, "value": val}
-    for val in df["programa"].unique()
-]
+def build_dropdowns() -> tuple[dcc.Dropdown, dcc.Dropdown, dcc.Dropdown]:
+    """ Builds the department, municipality and program dropdowns. Called when the page is rendered
+    so the dataset is only loaded once someone visits it. The municipality options are loaded on demand
+    by update_municipality_options.
+    """
+    dropdown_depts = dcc.Dropdown(
+        id="dept-dropdown",
+        options=build_dropdown_options("departamento"),
+        clearable=True,
+        multi=True,
+        placeholder="Todos los departamentos",
+    )
 
+    dropdown_mun = dcc.Dropdown(
+        id="mun-dropdown",
+        options=[],
+        clearable=True,
+        multi=True,
+        placeholder="Todos los municipios",
+    )
 
-dropdown_depts = dcc.Dropdown(
-    id="dept-dropdown",
-    options=dropdown_depts_options,
-    clearable=True,
-    multi=True,
-    placeholder="Todos los departamentos",
-)
+    dropdown_program = dcc.Dropdown(
+        id="program-dropdown",
+        options=build_dropdown_options("programa"),
+        clearable=True,
+        multi=True,
+        placeholder="Todos los programas",
+    )
 
+    return dropdown_depts, dropdown_mun, dropdown_program
 
-dropdown_mun = dcc.Dropdown(
-    id="mun-dropdown",
-    options=dropdown_mun_options,
-    clearable=True,
-    multi=True,
-    placeholder="Todos los municipios",
-)
 
-
-dropdown_program = dcc.Dropdown(
-    id="program-dropdown",
-    options=dropdown_programs_options,
-    clearable=True,
-    multi=True,
-    placeholder="Todos los programas",
-)
+GRAPH_STYLE = {'height': '100%', 'width': '100%'}
+GRAPH_LOADING_STYLE = {**GRAPH_STYLE, 'opacity': 0.4}
 
 
 graph_component = dcc.Graph(
@@ -59,10 +61,29 @@ graph_component = dcc.Graph(
         'displayModeBar': True,
         'modeBarButtonsToRemove': ['toImage', 'sendDataToCloud', 'editInChartStudio', 'zoom2d', 'select2d', 'lasso2d', 'autoScale2d', 'resetScale2d', 'zoomIn2d', 'zoomOut2d', 'pan2d', 'toggleHover', 'toggleSpikelines']
     },
-    style={'height': '100%', 'width': '100%'}
+    style=GRAPH_STYLE
 )
 
 
+status_component = html.Div([
+    html.Small(id='lines-status', className="text-muted me-2"),
+    dbc.Button("Cancelar", id='lines-cancel', size="sm", color="secondary", outline=True, style={'display': 'none'}),
+], style={'minHeight': '32px'})
+
+
+def build_download_links() -> html.Div:
+    """ Links to the streaming export of the selected rows (web/export.py). Their query string follows
+    the dropdowns through update_download_links, so the file is requested straight from the server
+    instead of going through a callback response.
+    """
+    link_class = "btn btn-outline-secondary btn-sm ms-2"
+    return html.Div([
+        html.Small("Descargar la selección:", className="text-muted"),
+        html.A("CSV", id='export-csv', href=get_relative_path('/export/subsidios.csv'), download="", className=link_class),
+        html.A("Parquet", id='export-parquet', href=get_relative_path('/export/subsidios.parquet'), download="", className=link_class),
+    ], className="text-end")
+
+
 text_component = dbc.Card(
     [
         dbc.CardHeader(html.H5("Explicación general:")),
@@ -77,43 +98,110 @@ text_component = dbc.Card(
 
 
 @callback(
+    Output('mun-dropdown', 'options'),
+    Input('mun-dropdown', 'search_value'),
+    Input('dept-dropdown', 'value'),
+    State('mun-dropdown', 'value')
+)
+def update_municipality_options(search_value: str, selected_depts: list[str], selected_muns: list[str]):
+    """
+    Returns the municipalities of the selected departments matching the typed text, capped at
+    MUNICIPALITY_OPTIONS_LIMIT. Already selected municipalities are always kept as options.
+    """
+    selected_muns = selected_muns or []
+    matches = dataset.municipalities.search(search_value or '', selected_depts or [], MUNICIPALITY_OPTIONS_LIMIT)
+
+    return [
+        {"label": val, "value": val}
+        for val in selected_muns + [name for name in matches if name not in selected_muns]
+    ]
+
+
+clientside_callback(
+    """
+    function(depts, muns, programs, csvHref, parquetHref) {
+        const params = new URLSearchParams();
+        (depts || []).forEach(value => params.append('departamento', value));
+        (muns || []).forEach(value => params.append('municipio', value));
+        (programs || []).forEach(value => params.append('programa', value));
+        const query = params.toString() ? '?' + params.toString() : '';
+        return [csvHref.split('?')[0] + query, parquetHref.split('?')[0] + query];
+    }
+    """,
+    Output('export-csv', 'href'),
+    Output('export-parquet', 'href'),
+    Input('dept-dropdown', 'value'),
+    Input('mun-dropdown', 'value'),
+    Input('program-dropdown', 'value'),
+    State('export-csv', 'href'),
+    State('export-parquet', 'href')
+)
+
+
+@cached_result
+def lines_figure(depts: list[str], muns: list[str], programs: list[str]) -> dict:
+    """ Yearly trend figure for a selection, shared across workers through the result cache.
+    """
+    return figure_payload(get_lines_plots(get_df(), depts=depts, muns=muns, programs=programs, cube=dataset.cube))
+
+
+@heavy_callback(
     Output('graph-container-lines', 'figure'),
     Input('dept-dropdown', 'value'),
     Input('mun-dropdown', 'value'),
-    Input('program-dropdown', 'value')
+    Input('program-dropdown', 'value'),
+    running=[
+        (Output('graph-container-lines', 'style'), GRAPH_LOADING_STYLE, GRAPH_STYLE),
+        (Output('lines-cancel', 'style'), {'display': 'inline-block'}, {'display': 'none'}),
+    ],
+    progress=Output('lines-status', 'children'),
+    progress_default="",
+    cancel=[Input('lines-cancel', 'n_clicks')],
 )
-def update_graph_homes(selected_depts, selected_muns, selected_programs):
+def update_graph_homes(set_progress, selected_depts, selected_muns, selected_programs):
     """
     Updates the graph based on selected departments, municipalities, and programs.
     If no filters are applied, shows the total value assigned by department.
+    Can run as a background job (see common/background.py), in which case changing the filters again
+    or pressing Cancelar stops the previous one. In the request the Cancelar button is never shown.
     """
-    
-    return get_lines_plots(
-        df,
-        depts=selected_depts if selected_depts else [],
-        muns=selected_muns if selected_muns else [],
-        programs=selected_programs if selected_programs else []
+    set_progress("Calculando la selección…")
+
+    # The order of the selected values does not change the figure, so sort them to share cache entries
+    return lines_figure(
+        sorted(selected_depts) if selected_depts else [],
+        sorted(selected_muns) if selected_muns else [],
+        sorted(selected_programs) if selected_programs else []
     )
 
 
-layout = dbc.Container([
-    dbc.Row([
-        dbc.Col(
-            html.Div([
-                html.H1("¿Cuáles son las tendencias de subsidios de vivienda en Colombia?", style={"textAlign": "center"}),
-            ]),
-            width=12
-        )
-    ]),
-    dbc.Row([
-        dbc.Col(dropdown_depts, width=4),
-        dbc.Col(dropdown_mun, width=4),
-        dbc.Col(dropdown_program, width=4),
-    ], className="mb-4"),
-    dbc.Row([
-        dbc.Col(graph_component, width=12, style={'height': 'auto'}),
-    ]),
-    dbc.Row([
-        dbc.Col(text_component, width=12, style={"marginTop": "20px", "marginBottom": "20px"})
-    ])
-], fluid=True, className="py-4")
+def layout(**kwargs):
+    """ Builds the page when it is requested, so the dropdown options are not computed at import.
+    """
+    dropdown_depts, dropdown_mun, dropdown_program = build_dropdowns()
+
+    return dbc.Container([
+        dbc.Row([
+            dbc.Col(
+                html.Div([
+                    html.H1("¿Cuáles son las tendencias de subsidios de vivienda en Colombia?", style={"textAlign": "center"}),
+                ]),
+                width=12
+            )
+        ]),
+        dbc.Row([
+            dbc.Col(dropdown_depts, width=4),
+            dbc.Col(dropdown_mun, width=4),
+            dbc.Col(dropdown_program, width=4),
+        ], className="mb-4"),
+        dbc.Row([
+            dbc.Col(status_component, width=6),
+            dbc.Col(build_download_links(), width=6),
+        ]),
+        dbc.Row([
+            dbc.Col(graph_component, width=12, style={'height': 'auto'}),
+        ]),
+        dbc.Row([
+            dbc.Col(text_component, width=12, style={"marginTop": "20px", "marginBottom": "20px"})
+        ])
+    ], fluid=True, className="py-4")
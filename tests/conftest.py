@@ -0,0 +1,55 @@
+import importlib
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_export
+from common.load_data import load_data, preprocess_data
+from definitions import FILE_NAME
+
+
+# The module, not the `load_data` function that common re-exports under the same name
+load_data_module = importlib.import_module('common.load_data')
+
+
+@pytest.fixture(scope='session')
+def export_csv(tmp_path_factory) -> str:
+    """A small synthetic raw export with the columns and value shapes of the real one."""
+    return write_export(str(tmp_path_factory.mktemp('export') / 'export.csv'), 5000, seed=1)
+
+
+@pytest.fixture(scope='session')
+def aggregated(export_csv) -> pd.DataFrame:
+    """The export preprocessed like load_data does: assigned rows summed by year, region and program."""
+    df = preprocess_data(export_csv, 0)
+    df.attrs['version'] = 'test'
+    return df
+
+
+@pytest.fixture
+def export_path(export_csv, tmp_path, monkeypatch) -> str:
+    """A copy of the export where load_data and source_changed look for it, next to its Parquet cache."""
+    (tmp_path / 'data').mkdir()
+    path = str(tmp_path / 'data' / FILE_NAME)
+    shutil.copyfile(export_csv, path)
+
+    monkeypatch.setattr(load_data_module, 'ROOT_DIR', str(tmp_path))
+    load_data.cache_clear()
+    yield path
+    load_data.cache_clear()
+
+
+def touch(path: str) -> None:
+    """Moves the modification time of path a second ahead without changing its content."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def append_row(path: str) -> None:
+    """Changes the content of an export by repeating its first row."""
+    with open(path, encoding='utf-8') as file:
+        row = file.read().splitlines()[1]
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(row + '\n')
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from common import aggregation
+from common.aggregation import Grouping, group_sums
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        'departamento': ['B', 'A', 'B', None, 'C', 'A', 'C', 'B'],
+        'programa': ['X', 'Y', 'X', 'X', None, 'X', 'Y', 'Y'],
+        'hogares': [1, 2, 3, 4, 5, 6, 7, 8],
+        'valor_asignado': [10.0, 20.0, np.nan, 40.0, 50.0, 60.0, 70.0, 80.0],
+    })
+
+
+def pandas_sums(df: pd.DataFrame, keys: list[str], columns: list[str]) -> pd.DataFrame:
+    return df.groupby(keys, as_index=False, observed=True, dropna=True)[columns].sum()
+
+
+@pytest.mark.parametrize('keys', [['departamento'], ['departamento', 'programa'], ['programa', 'departamento']])
+def test_group_sums_matches_pandas_with_null_keys(frame, keys):
+    expected = pandas_sums(frame, keys, ['hogares', 'valor_asignado'])
+    result = group_sums(frame, keys, ['hogares', 'valor_asignado'])
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_group_sums_matches_pandas_on_categorical_keys(frame):
+    coded = frame.astype({'departamento': 'category', 'programa': 'category'})
+    # An unused category must not show up as a group, as with observed=True
+    coded['departamento'] = coded['departamento'].cat.add_categories(['Z'])
+
+    expected = pandas_sums(coded, ['departamento', 'programa'], ['hogares'])
+    result = group_sums(coded, ['departamento', 'programa'], ['hogares'])
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_sparse_key_space_matches_dense(frame, monkeypatch):
+    expected = group_sums(frame, ['departamento', 'programa'], ['hogares', 'valor_asignado'])
+    monkeypatch.setattr(aggregation, 'DENSE_KEY_RATIO', 0)
+    result = group_sums(frame, ['departamento', 'programa'], ['hogares', 'valor_asignado'])
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_integer_sums_stay_exact_beyond_float_precision():
+    df = pd.DataFrame({'key': ['a', 'a', 'b'], 'value': np.array([2 ** 53, 1, 3], dtype='int64')})
+    result = group_sums(df, ['key'], ['value'])
+    assert result['value'].tolist() == [2 ** 53 + 1, 3]
+    assert result['value'].dtype == 'int64'
+
+
+def test_mean_and_count_skip_nulls(frame):
+    grouping = Grouping.by(frame, 'departamento')
+    expected = frame.groupby('departamento')['valor_asignado'].agg(['mean', 'count'])
+    np.testing.assert_allclose(grouping.mean(frame['valor_asignado']), expected['mean'].to_numpy())
+    assert grouping.count(frame['valor_asignado']).tolist() == expected['count'].tolist()
+
+
+def test_top_k_breaks_ties_by_key_order_and_ranks_nan_last():
+    df = pd.DataFrame({
+        'key': ['d', 'c', 'b', 'a', 'e', 'f'],
+        'score': [5.0, 7.0, 5.0, 7.0, np.nan, 1.0],
+    })
+    grouping = Grouping.by(df, 'key')
+    scores = grouping.sum(df['score'])
+    scores[grouping.keys()['key'] == 'e'] = np.nan
+
+    ranked = grouping.frame({'score': scores}, grouping.top_k(scores, 6))
+    assert ranked['key'].tolist() == ['a', 'c', 'b', 'd', 'f', 'e']
+
+    assert grouping.frame({'score': scores}, grouping.top_k(scores, 3))['key'].tolist() == ['a', 'c', 'b']
+    assert grouping.frame({'score': scores}, grouping.top_k(scores, 2, ascending=True))['key'].tolist() == ['f', 'b']
+
+
+@pytest.mark.parametrize('k', range(1, 8))
+def test_top_k_keeps_key_order_among_ties_at_the_cut(k):
+    df = pd.DataFrame({'key': list('abcdefghij'), 'score': [1.0, 3.0, 3.0, 3.0, 3.0, 3.0, 3.0, 9.0, 3.0, 0.0]})
+    grouping = Grouping.by(df, 'key')
+    scores = grouping.sum(df['score'])
+
+    expected = df.sort_values(['score', 'key'], ascending=[False, True])['key'].tolist()[:k]
+    assert grouping.frame({'score': scores}, grouping.top_k(scores, k))['key'].tolist() == expected
+
+
+def test_top_k_matches_pandas_nlargest(frame):
+    grouping = Grouping.by(frame, ['departamento', 'programa'])
+    totals = grouping.sum(frame['hogares'])
+    result = grouping.frame({'hogares': totals}, grouping.top_k(totals, 3))
+
+    expected = pandas_sums(frame, ['departamento', 'programa'], ['hogares']).nlargest(3, 'hogares', keep='first')
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
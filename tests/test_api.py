@@ -0,0 +1,64 @@
+import importlib
+
+from types import SimpleNamespace
+
+import pytest
+
+from flask import Flask
+
+from common.dataset import Dataset
+from web import api
+
+
+# The module, not the `dataset` instance that common re-exports under the same name
+dataset_module = importlib.import_module('common.dataset')
+
+
+@pytest.fixture
+def client(aggregated, monkeypatch):
+    monkeypatch.setattr(dataset_module, 'delta_paths', lambda: [])
+    monkeypatch.setattr(api, 'dataset', Dataset(lambda: aggregated))
+    app = SimpleNamespace(server=Flask(__name__))
+    api.install_api(app)
+    return app.server.test_client()
+
+
+def test_response_carries_strong_etag_and_cache_control(client):
+    response = client.get('/api/programs')
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 'test'
+    etag, weak = response.get_etag()
+    assert etag and not weak
+    assert response.headers['Cache-Control'] == f"public, max-age={api.API_MAX_AGE}"
+
+
+def test_matching_if_none_match_gets_304_without_computing(client, monkeypatch):
+    etag = client.get('/api/yearly?programa=MI CASA YA').get_etag()[0]
+
+    monkeypatch.setattr(api, 'records', lambda frame: pytest.fail("the data was computed for a 304"))
+    for tag in (f'"{etag}"', f'"{etag}:br"', f'W/"other", "{etag}:gzip"', '*'):
+        response = client.get('/api/yearly?programa=MI CASA YA', headers={'If-None-Match': tag})
+        assert response.status_code == 304, tag
+        assert response.data == b''
+        assert response.get_etag()[0] == etag
+
+
+def test_etag_depends_on_the_normalized_query(client):
+    def etag(query: str) -> str:
+        return client.get(f'/api/top-regions?{query}').get_etag()[0]
+
+    assert etag('variable=hogares&k=3&programa=A&programa=B') == etag('programa=B&k=3&variable=hogares&programa=A')
+    assert etag('variable=hogares&k=3') != etag('variable=hogares&k=4')
+
+
+def test_stale_etag_gets_the_data(client):
+    response = client.get('/api/programs', headers={'If-None-Match': '"stale"'})
+    assert response.status_code == 200
+    assert response.get_json()['data']
+
+
+def test_invalid_parameter_is_a_400_that_is_not_cached(client):
+    response = client.get('/api/top-regions?variable=hogares&k=0')
+    assert response.status_code == 400
+    assert 'k must be between' in response.get_json()['error']
+    assert response.headers['Cache-Control'] == 'no-store'
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from common.cube import YEAR, YearCube
+from common.data_analysis import get_yearly_totals
+
+
+@pytest.fixture(scope='module')
+def cube(aggregated) -> YearCube:
+    return YearCube(aggregated)
+
+
+def selections(df: pd.DataFrame) -> list[tuple[list, list, list]]:
+    dept = df['departamento'].iloc[0]
+    muns = list(df.loc[df['departamento'] == dept, 'municipio'].unique()[:2])
+    programs = list(df['programa'].unique()[:2])
+    return [
+        ([], [], []),
+        ([dept], [], []),
+        ([], muns, []),
+        ([], [], programs),
+        ([dept], [], programs[:1]),
+        ([dept], muns, programs),
+        (list(df['departamento'].unique()[:3]), [], programs),
+        (['NO EXISTE'], [], []),
+    ]
+
+
+def test_cube_matches_yearly_totals(aggregated, cube):
+    for depts, muns, programs in selections(aggregated):
+        expected = get_yearly_totals(aggregated, depts, muns, programs)
+        result = cube.yearly(depts, muns, programs)
+
+        assert result[YEAR].tolist() == expected[YEAR].tolist(), (depts, muns, programs)
+        assert result['hogares'].tolist() == expected['hogares'].tolist()
+        assert result['valor_asignado'].tolist() == expected['valor_asignado'].tolist()
+        pd.testing.assert_series_equal(result['valor_por_hogar'], expected['valor_por_hogar'], check_dtype=False)
+
+
+def test_unknown_values_select_nothing(cube):
+    assert cube.yearly(['NO EXISTE'], [], []).empty
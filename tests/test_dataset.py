@@ -0,0 +1,64 @@
+import functools
+import importlib
+import os
+
+import pytest
+
+from common.dataset import Dataset
+from common.load_data import load_data
+from tests.conftest import append_row, touch
+
+
+# The modules, not the `dataset` instance and `load_data` function that common re-exports under those names
+dataset_module = importlib.import_module('common.dataset')
+load_data_module = importlib.import_module('common.load_data')
+
+
+@pytest.fixture(autouse=True)
+def no_deltas(monkeypatch):
+    monkeypatch.setattr(dataset_module, 'delta_paths', lambda: [])
+
+
+@pytest.mark.parametrize('use_cache', [True, False])
+def test_touched_export_keeps_the_snapshot(export_path, use_cache):
+    loader = functools.partial(load_data, use_cache=use_cache, compact=False, chunksize=0)
+    loader.cache_clear = load_data.cache_clear
+    dataset = Dataset(loader)
+    snapshot = dataset.current()
+
+    touch(export_path)
+    assert load_data_module.source_changed(snapshot.frame.attrs['fingerprint'])
+
+    assert not dataset.refresh()
+    assert dataset.current() is snapshot
+    assert not load_data_module.source_changed(snapshot.frame.attrs['fingerprint'])
+    assert not dataset.refresh()
+
+
+def test_touched_export_is_not_rehashed_after_the_cache_is_refreshed(export_path):
+    load_data(compact=False, chunksize=0)
+    touch(export_path)
+
+    cache_path = os.path.join(os.path.dirname(export_path), load_data_module.CACHE_FILE_NAME)
+    df = load_data_module.read_cache(cache_path, export_path)
+    assert df.attrs['fingerprint']['mtime_ns'] == os.stat(export_path).st_mtime_ns
+
+    # The cache now records the new modification time, so it matches without hashing the export again
+    def no_hash(*_):
+        raise AssertionError("hashed the export again")
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(load_data_module, 'hash_file', no_hash)
+        assert load_data_module.read_cache(cache_path, export_path) is not None
+
+
+def test_changed_export_installs_a_new_snapshot(export_path):
+    dataset = Dataset(load_data)
+    snapshot = dataset.current()
+
+    append_row(export_path)
+
+    assert dataset.refresh()
+    assert dataset.current() is not snapshot
+    assert dataset.version != snapshot.version
+    assert not dataset.refresh()
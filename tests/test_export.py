@@ -0,0 +1,87 @@
+import importlib
+import io
+
+from types import SimpleNamespace
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from flask import Flask
+
+from common.dataset import Dataset
+from web import export
+
+
+# The module, not the `dataset` instance that common re-exports under the same name
+dataset_module = importlib.import_module('common.dataset')
+
+
+@pytest.fixture
+def client(aggregated, monkeypatch):
+    monkeypatch.setattr(dataset_module, 'delta_paths', lambda: [])
+    monkeypatch.setattr(export, 'dataset', Dataset(lambda: aggregated))
+    app = SimpleNamespace(server=Flask(__name__))
+    export.install_export(app)
+    return app.server.test_client()
+
+
+@pytest.fixture
+def selection(aggregated) -> tuple[dict, pd.DataFrame]:
+    """Query parameters selecting two departments and one program, and the rows they select."""
+    departments = aggregated['departamento'].value_counts().index[:2].tolist()
+    program = aggregated['programa'].value_counts().index[0]
+    rows = aggregated[aggregated['departamento'].isin(departments) & (aggregated['programa'] == program)]
+    assert 0 < len(rows) < len(aggregated)
+    return {'departamento': departments, 'programa': program}, rows
+
+
+def sorted_rows(df: pd.DataFrame) -> pd.DataFrame:
+    # The view serves the dimensions as categoricals
+    df = df.astype({column: 'object' for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)})
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+def test_csv_export_has_the_filtered_rows(client, selection):
+    query, expected = selection
+    response = client.get('/export/subsidios.csv', query_string=query)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['X-Export-Rows'] == str(len(expected))
+    assert response.headers['Content-Disposition'] == 'attachment; filename="subsidios_test.csv"'
+
+    rows = pd.read_csv(io.BytesIO(response.get_data()))
+    assert list(rows.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(sorted_rows(rows), sorted_rows(expected), check_dtype=False)
+
+
+def test_parquet_export_is_readable_with_the_dataset_schema(client, selection, aggregated):
+    query, expected = selection
+    response = client.get('/export/subsidios.parquet', query_string=query)
+
+    assert response.status_code == 200
+    assert response.headers['X-Export-Rows'] == str(len(expected))
+
+    table = pq.read_table(io.BytesIO(response.get_data()))
+    assert table.schema.names == list(aggregated.columns)
+    assert table.num_rows == len(expected)
+    pd.testing.assert_frame_equal(sorted_rows(table.to_pandas()), sorted_rows(expected))
+
+
+def test_parquet_export_has_one_row_group_per_chunk(client, aggregated):
+    view = export.dataset.view
+    data = b''.join(export.parquet_chunks(view, chunk_rows=100))
+
+    metadata = pq.ParquetFile(io.BytesIO(data)).metadata
+    assert metadata.num_rows == len(aggregated)
+    assert metadata.num_row_groups == -(-len(aggregated) // 100)
+
+
+def test_csv_chunks_match_a_single_block(client):
+    view = export.dataset.view.where(programa=[export.dataset.frame['programa'].iloc[0]])
+    assert b''.join(export.csv_chunks(view, chunk_rows=7)) == view.to_frame().to_csv(index=False).encode('utf-8')
+
+
+def test_unknown_format_is_a_404(client):
+    assert client.get('/export/subsidios.xlsx').status_code == 404
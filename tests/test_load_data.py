@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_export
+from common.load_data import GROUP_KEYS, compact_dtypes, merge_delta, preprocess_data
+
+
+@pytest.fixture(scope='module')
+def exports(tmp_path_factory) -> tuple[str, str, str]:
+    """A base export, a delta export and the two concatenated, as raw CSV files."""
+    directory = tmp_path_factory.mktemp('deltas')
+    base, delta = generate_export(4000, seed=2), generate_export(600, seed=3)
+    paths = [str(directory / name) for name in ('base.csv', '20260101_delta.csv', 'full.csv')]
+    base.to_csv(paths[0], index=False)
+    delta.to_csv(paths[1], index=False)
+    pd.concat([base, delta]).to_csv(paths[2], index=False)
+    return tuple(paths)
+
+
+def normalized(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.astype({column: 'object' for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)})
+    return df.sort_values(GROUP_KEYS, ignore_index=True)
+
+
+@pytest.mark.parametrize('chunksize', [97, 700, 5000, 100_000])
+def test_chunked_ingest_matches_whole_file_read(export_csv, chunksize):
+    expected = preprocess_data(export_csv, 0)
+    result = preprocess_data(export_csv, chunksize)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_merge_delta_matches_full_recompute(exports, compact):
+    base_path, delta_path, full_path = exports
+    base = preprocess_data(base_path, 0)
+    base.attrs['version'] = 'v-test'
+    if compact:
+        base = compact_dtypes(base)
+
+    merged = merge_delta(base, delta_path)
+    expected = preprocess_data(full_path, 0)
+
+    pd.testing.assert_frame_equal(normalized(merged), normalized(expected), check_dtype=False)
+    assert merged.attrs['version'].startswith('v-test+')
+    assert merged.attrs['deltas'] == [os.path.basename(delta_path)]
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.data_analysis import rank_regions
+from common.rankings import MEASURES, RegionRankings
+
+
+@pytest.fixture(params=['object', 'category'])
+def frame(request) -> pd.DataFrame:
+    """Departments with tied totals, a null program and a NaN value per household, as object or categorical keys."""
+    df = pd.DataFrame({
+        'departamento': ['B', 'A', 'C', 'D', 'A', 'B', 'C', 'E', 'D', 'A', 'F'],
+        'programa': ['X', 'X', 'X', 'X', 'Y', 'Y', 'Y', 'Y', 'X', 'X', None],
+        'hogares': [3, 3, 5, 1, 2, 7, 2, 4, 2, 1, 9],
+        'valor_asignado': [30.0, 30.0, 10.0, 25.0, 8.0, 70.0, 9.0, 40.0, 5.0, 2.0, 90.0],
+    })
+    df['valor_por_hogar'] = df['valor_asignado'] / df['hogares']
+    df.loc[3, 'valor_por_hogar'] = np.nan
+    return df.astype({'departamento': request.param, 'programa': request.param})
+
+
+def plain(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({'departamento': 'object'}).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('measure', MEASURES)
+@pytest.mark.parametrize('k', [1, 3, 10])
+def test_top_matches_rank_regions_within_each_program(frame, measure, k):
+    rankings = RegionRankings(frame)
+    assert rankings.programs == ['X', 'Y']
+
+    for program in rankings.programs:
+        expected = rank_regions(frame[frame['programa'] == program], measure, k)
+        pd.testing.assert_frame_equal(plain(rankings.top(measure, k, program)), plain(expected))
+
+
+@pytest.mark.parametrize('measure', MEASURES)
+@pytest.mark.parametrize('k', [1, 3, 10])
+def test_top_matches_rank_regions_over_all_programs(frame, measure, k):
+    expected = rank_regions(frame, measure, k)
+    pd.testing.assert_frame_equal(plain(RegionRankings(frame).top(measure, k)), plain(expected))
+
+
+def test_unknown_program_or_variable(frame):
+    rankings = RegionRankings(frame)
+    assert rankings.top('hogares', 5, 'Z').empty
+    with pytest.raises(ValueError):
+        rankings.top('municipio', 5)
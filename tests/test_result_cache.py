@@ -0,0 +1,68 @@
+import importlib
+
+import pytest
+
+from common.result_cache import MemoryBackend, ResultCache, code_version
+
+
+# The module, not the `result_cache` instance that common re-exports under the same name
+result_cache_module = importlib.import_module('common.result_cache')
+
+
+class Counter:
+    """A computation that counts how often it runs."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {'calls': self.calls}
+
+
+@pytest.fixture
+def versions() -> dict:
+    return {'dataset': 'v1-aaaa'}
+
+
+@pytest.fixture
+def cache(versions) -> ResultCache:
+    return ResultCache(MemoryBackend(), version=lambda: versions['dataset'], release='code-1')
+
+
+def test_same_arguments_hit(cache):
+    compute = Counter()
+    assert cache.get_or_compute('pages.f', ('A', [1, 2]), compute) == {'calls': 1}
+    assert cache.get_or_compute('pages.f', ('A', [1, 2]), compute) == {'calls': 1}
+    assert cache.get_or_compute('pages.f', ('B', [1, 2]), compute) == {'calls': 2}
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'entries': 2}
+
+
+def test_new_dataset_version_misses(cache, versions):
+    compute = Counter()
+    cache.get_or_compute('pages.f', ('A',), compute)
+
+    versions['dataset'] = 'v1-bbbb'
+    assert cache.get_or_compute('pages.f', ('A',), compute) == {'calls': 2}
+    assert compute.calls == 2
+
+
+def test_new_code_version_misses(cache):
+    compute = Counter()
+    cache.get_or_compute('pages.f', ('A',), compute)
+
+    redeployed = ResultCache(cache.backend, version=cache.version, release='code-2')
+    assert redeployed.get_or_compute('pages.f', ('A',), compute) == {'calls': 2}
+    assert cache.get_or_compute('pages.f', ('A',), compute) == {'calls': 1}
+
+
+def test_code_version_follows_the_source(tmp_path, monkeypatch):
+    (tmp_path / 'common').mkdir()
+    (tmp_path / 'common' / 'analysis.py').write_text("def f():\n    return 1\n")
+    monkeypatch.setattr(result_cache_module, 'ROOT_DIR', str(tmp_path))
+
+    before = code_version(('common',))
+    assert code_version(('common',)) == before
+
+    (tmp_path / 'common' / 'analysis.py').write_text("def f():\n    return 2\n")
+    assert code_version(('common',)) != before
@@ -0,0 +1,84 @@
+import functools
+import os
+
+import pandas as pd
+import pytest
+
+from common.load_data import load_data
+from common.shared_frame import attach_frame, load_shared, publish_frame, read_manifest
+from tests.conftest import append_row, touch
+
+
+class CountingLoader:
+    """load_data, counting how often the dataset is loaded to be published."""
+
+    def __init__(self, compact: bool = True):
+        self.load = functools.partial(load_data, compact=compact, chunksize=0)
+        self.calls = 0
+
+    def __call__(self) -> pd.DataFrame:
+        self.calls += 1
+        return self.load()
+
+    def cache_clear(self) -> None:
+        load_data.cache_clear()
+
+
+def as_objects(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({column: 'object' for column in df.columns if not pd.api.types.is_numeric_dtype(df[column])})
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_attached_frame_equals_the_published_one(export_path, tmp_path, compact):
+    frame = load_data(compact=compact, chunksize=0)
+    directory = str(tmp_path / 'shared')
+    path = publish_frame(frame, directory)
+
+    assert read_manifest(directory)[0] == path
+    attached = attach_frame(*read_manifest(directory))
+
+    pd.testing.assert_frame_equal(as_objects(attached), as_objects(frame))
+    assert attached.attrs['version'] == frame.attrs['version']
+    assert attached.attrs['fingerprint'] == frame.attrs['fingerprint']
+    assert all(not attached[column].to_numpy().flags.writeable for column in ('hogares', 'valor_asignado'))
+
+
+def test_load_shared_publishes_once(export_path, tmp_path):
+    directory, loader = str(tmp_path / 'shared'), CountingLoader()
+    first = load_shared(directory, loader)
+    second = load_shared(directory, loader)
+
+    assert loader.calls == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_touched_export_is_not_republished(export_path, tmp_path):
+    directory, loader = str(tmp_path / 'shared'), CountingLoader()
+    published = load_shared(directory, loader)
+    path = read_manifest(directory)[0]
+    inode = os.stat(os.path.join(path, '0.npy')).st_ino
+
+    touch(export_path)
+    attached = load_shared(directory, loader)
+
+    assert loader.calls == 1
+    assert os.stat(os.path.join(path, '0.npy')).st_ino == inode
+    assert attached.attrs['version'] == published.attrs['version']
+    assert attached.attrs['fingerprint']['mtime_ns'] == os.stat(export_path).st_mtime_ns
+
+    load_shared(directory, loader)
+    assert loader.calls == 1
+
+
+def test_changed_export_is_republished(export_path, tmp_path):
+    directory, loader = str(tmp_path / 'shared'), CountingLoader()
+    published = load_shared(directory, loader)
+
+    append_row(export_path)
+    republished = load_shared(directory, loader)
+
+    assert loader.calls == 2
+    assert republished.attrs['version'] != published.attrs['version']
+    assert sorted(os.listdir(directory)) == sorted(['.lock', 'current', republished.attrs['version']])
+    # Processes that attached the first version keep reading it after its files are removed
+    assert published['hogares'].sum() > 0
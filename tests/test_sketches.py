@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.sketches import HyperLogLog, TDigest
+
+
+# Rank error allowed for quantile estimates with the default compression, as a fraction of the count
+RANK_ERROR = 0.01
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+
+@pytest.fixture(scope='module')
+def values() -> np.ndarray:
+    return np.random.default_rng(0).lognormal(15, 1, size=100_000)
+
+
+def rank_errors(data: np.ndarray, estimates: np.ndarray) -> np.ndarray:
+    """How far each estimate's actual rank in data is from the quantile it was asked for."""
+    ranks = np.searchsorted(np.sort(data), estimates, side='right') / len(data)
+    return np.abs(ranks - QUANTILES)
+
+
+def test_tdigest_quantiles_within_rank_error(values):
+    digest = TDigest.from_values(values)
+    assert rank_errors(values, digest.quantile(QUANTILES)).max() < RANK_ERROR
+
+
+def test_tdigest_exact_moments_and_extremes(values):
+    digest = TDigest.from_values(np.r_[values, np.nan])
+    assert digest.count == len(values)
+    assert digest.min == values.min()
+    assert digest.max == values.max()
+    assert digest.mean == pytest.approx(values.mean(), rel=1e-9)
+    assert digest.std() == pytest.approx(values.std(ddof=1), rel=1e-9)
+
+
+def test_merged_tdigest_matches_digest_of_combined_values(values):
+    parts = np.array_split(values, 7)
+    merged = TDigest.merge_all([TDigest.from_values(part) for part in parts])
+    whole = TDigest.from_values(values)
+
+    assert merged.count == whole.count
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+    assert merged.mean == pytest.approx(whole.mean, rel=1e-9)
+    assert merged.std() == pytest.approx(whole.std(), rel=1e-9)
+    assert rank_errors(values, merged.quantile(QUANTILES)).max() < RANK_ERROR
+
+
+def test_tdigest_histogram_counts_every_value(values):
+    digest = TDigest.from_values(values)
+    edges = np.linspace(values.min(), values.max(), 31)
+    counts = digest.histogram(edges)
+    exact, _ = np.histogram(values, edges)
+
+    assert counts.sum() == pytest.approx(len(values))
+    assert np.abs(counts - exact).max() < RANK_ERROR * len(values)
+
+
+def test_hyperloglog_exact_below_register_count():
+    sketch = HyperLogLog().update(pd.Series([f"value {n % 4000}" for n in range(10_000)]))
+    assert sketch.exact is not None
+    assert sketch.estimate() == 4000
+
+
+@pytest.mark.parametrize('distinct', [10_000, 200_000])
+def test_hyperloglog_within_relative_error(distinct):
+    sketch = HyperLogLog().update(pd.Series(np.arange(distinct)))
+    # Three standard errors of 1.04 / sqrt(4096)
+    assert sketch.exact is None
+    assert abs(sketch.estimate() - distinct) / distinct < 3 * 1.04 / 64
+
+
+@pytest.mark.parametrize('size', [1000, 50_000])
+def test_merged_hyperloglog_matches_sketch_of_combined_values(size):
+    first, second = pd.Series(np.arange(size)), pd.Series(np.arange(size // 2, size * 2))
+    merged = HyperLogLog().update(first).merge(HyperLogLog().update(second))
+    combined = HyperLogLog().update(pd.concat([first, second]))
+
+    np.testing.assert_array_equal(merged.registers, combined.registers)
+    assert merged.estimate() == combined.estimate()
+    if size * 2 <= 4096:
+        assert merged.estimate() == size * 2
+
+
+def test_sketches_survive_serialization(values):
+    digest = TDigest.from_values(values)
+    restored = TDigest.from_dict(digest.to_dict())
+    np.testing.assert_array_equal(restored.quantile(QUANTILES), digest.quantile(QUANTILES))
+
+    sketch = HyperLogLog().update(pd.Series(np.arange(5000)))
+    assert HyperLogLog.from_dict(sketch.to_dict()).estimate() == sketch.estimate()
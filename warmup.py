@@ -0,0 +1,86 @@
+"""
+Prebuilds the figures and tables whose inputs come from a fixed dropdown domain and stores them in the
+shared result cache, so the first visitor after a deploy is served precomputed payloads.
+
+    python warmup.py [--workers N]
+
+Set SUBSIDIOS_WARMUP=1 to run it automatically when the app starts: by gunicorn once the workers are up
+(see gunicorn.conf.py), or before `python app.py` serves.
+"""
+import argparse
+import importlib
+import logging
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+
+def warmup_tasks() -> list[tuple[str, str, tuple]]:
+    """Returns (module, cached function, arguments) for every precomputable output of the pages."""
+    import app  # noqa: F401  registers the pages
+    from pages import analysis, second_question
+
+    tasks = []
+    for option in analysis.dropdown_options:
+        tasks.append(('pages.analysis', 'summary_statistics', (option['value'],)))
+        tasks.append(('pages.analysis', 'variable_figure', (option['value'], option['label'])))
+    from common import dataset
+    for program in dataset.rankings.programs:
+        for option in second_question.dropdown_options:
+            tasks.append(('pages.second_question', 'regions_figure', (program, option['value'], second_question.DEFAULT_REGIONS)))
+    tasks.append(('pages.first_question', 'summary_by_program', ()))
+    tasks.append(('pages.third_question', 'lines_figure', ([], [], [])))
+    return tasks
+
+
+def run_task(task: tuple[str, str, tuple]) -> tuple[str, float]:
+    """Computes one task through its cached function and returns its name and duration."""
+    import app  # noqa: F401
+
+    module_name, function_name, args = task
+    start = time.perf_counter()
+    getattr(importlib.import_module(module_name), function_name)(*args)
+    return f"{module_name}.{function_name}{args}", time.perf_counter() - start
+
+
+def run_warmup(workers: int | None = None) -> list[tuple[str, float]]:
+    """
+    Runs every warmup task on a process pool of `workers` processes (one per core by default).
+    The dataset is loaded before the pool starts, so forked workers inherit it instead of reloading it.
+    """
+    from common import dataset, result_cache
+    from common.result_cache import MemoryBackend
+
+    if result_cache.backend is None or isinstance(result_cache.backend, MemoryBackend):
+        logger.warning("Warmup skipped: the result cache is not shared between processes")
+        return []
+
+    # Load the data, its derived structures and the plotting modules before forking, so workers inherit them
+    import plotly.express  # noqa: F401
+    dataset.warm()
+    tasks = warmup_tasks()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        results = list(executor.map(run_task, tasks))
+    logger.info("Warmup built %d outputs in %.2fs", len(results), time.perf_counter() - start)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    for name, seconds in run_warmup(args.workers):
+        print(f"{seconds:8.3f}s  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Read-only JSON API over the aggregates the dashboard shows, for other services:
+
+- GET /api/programs: households and share by program (get_summary_by_program);
+- GET /api/yearly?departamento=&municipio=&programa=: yearly totals for a selection (the trends page);
+- GET /api/top-regions?variable=hogares&programa=&k=5: departments ranked by a variable (RegionRankings,
+  or rank_regions for selections beyond one program).
+
+List parameters may be repeated; their order does not matter. Every response carries a strong ETag
+derived from the dataset version and the normalized query, and Cache-Control: public, so reverse proxies
+can serve repeated requests. A request whose If-None-Match matches gets a 304 before anything is computed.
+"""
+import functools
+import hashlib
+import json
+
+import pandas as pd
+
+from flask import Response, jsonify, request
+
+from common import dataset, get_summary_by_program, rank_regions
+from definitions import API_MAX_AGE
+
+
+# Part of every ETag: bump when the shape of the responses changes
+API_FORMAT = 1
+
+FILTERS = ['departamento', 'municipio', 'programa']
+VARIABLES = ['hogares', 'valor_asignado', 'valor_por_hogar']
+MAX_K = 50
+
+
+def normalized_query() -> list:
+    """The query parameters sorted by name, each with its distinct values sorted."""
+    return [[name, sorted(set(request.args.getlist(name)))] for name in sorted(request.args)]
+
+
+def query_etag(version: str) -> str:
+    payload = json.dumps([API_FORMAT, version, request.path, normalized_query()], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def etag_matches(etag: str) -> bool:
+    """
+    True when If-None-Match names etag. flask-compress sends compressed responses with the encoding
+    appended to the ETag (e.g. "<etag>:br"), so clients revalidate with that form.
+    """
+    tags = request.if_none_match
+    return tags.star_tag or any(tag.split(':', 1)[0] == etag for tag in tags.as_set())
+
+
+def records(frame: pd.DataFrame) -> list[dict]:
+    """The rows of frame as JSON objects, with categories as strings and NaN as null."""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict(orient='records')
+
+
+def json_endpoint(view):
+    """
+    Serves the records returned by view as {"version", "data"}, with the ETag and Cache-Control headers.
+    A ValueError raised by view becomes a 400 response with its message.
+    """
+
+    @functools.wraps(view)
+    def wrapper():
+        version = dataset.version
+        etag = query_etag(version)
+        if etag_matches(etag):
+            response = Response(status=304)
+        else:
+            try:
+                data = view()
+            except ValueError as error:
+                response = jsonify({'error': str(error)})
+                response.status_code = 400
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+            response = jsonify({'version': version, 'data': data})
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f"public, max-age={API_MAX_AGE}"
+        return response
+
+    return wrapper
+
+
+def filters() -> dict[str, list[str]]:
+    return {name: request.args.getlist(name) for name in FILTERS}
+
+
+@json_endpoint
+def programs() -> list[dict]:
+    return records(get_summary_by_program(dataset.coded))
+
+
+@json_endpoint
+def yearly() -> list[dict]:
+    selection = filters()
+    return records(dataset.cube.yearly(selection['departamento'], selection['municipio'], selection['programa']))
+
+
+@json_endpoint
+def top_regions() -> list[dict]:
+    variable = request.args.get('variable', 'hogares')
+    if variable not in VARIABLES:
+        raise ValueError(f"variable must be one of {', '.join(VARIABLES)}")
+    try:
+        k = int(request.args.get('k', '5'))
+    except ValueError:
+        raise ValueError("k must be an integer") from None
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}")
+
+    selection = filters()
+    # All programs or a single one are precomputed rankings; other selections are ranked on their rows
+    programs = sorted(set(selection.get('programa') or []))
+    if not any(selection.get(name) for name in FILTERS if name != 'programa') and len(programs) <= 1:
+        return records(dataset.rankings.top(variable, k, programs[0] if programs else None))
+
+    view = dataset.view.where(**selection)
+    return records(rank_regions(view, variable, k))
+
+
+def install_api(app, prefix: str = '/api') -> None:
+    """Adds the JSON endpoints to app.server under prefix."""
+    server = app.server
+    server.add_url_rule(f"{prefix}/programs", 'api_programs', programs)
+    server.add_url_rule(f"{prefix}/yearly", 'api_yearly', yearly)
+    server.add_url_rule(f"{prefix}/top-regions", 'api_top_regions', top_regions)
@@ -0,0 +1,28 @@
+"""
+Response compression for the Flask server behind the Dash app (flask-compress).
+
+Callback responses, the layout and the component bundles (plotly.js alone is several MB) are compressed
+with the first algorithm the browser accepts among SUBSIDIOS_COMPRESS_ALGORITHMS, when they are at least
+SUBSIDIOS_COMPRESS_MIN_SIZE bytes. Smaller responses are sent as they are, since compressing them costs
+more time than the bytes it saves.
+"""
+from definitions import COMPRESS_ALGORITHMS, COMPRESS_BR_LEVEL, COMPRESS_LEVEL, COMPRESS_MIN_SIZE
+
+
+def install_compression(
+    app,
+    algorithms: list[str] = COMPRESS_ALGORITHMS,
+    min_size: int = COMPRESS_MIN_SIZE,
+    gzip_level: int = COMPRESS_LEVEL,
+    br_level: int = COMPRESS_BR_LEVEL
+) -> None:
+    """Compresses the responses of app.server; flask-compress reads its settings when it is initialized."""
+    from flask_compress import Compress
+
+    app.server.config.update(
+        COMPRESS_ALGORITHM=algorithms,
+        COMPRESS_MIN_SIZE=min_size,
+        COMPRESS_LEVEL=gzip_level,
+        COMPRESS_BR_LEVEL=br_level,
+    )
+    Compress(app.server)
@@ -0,0 +1,109 @@
+"""
+Streaming download of the rows behind the trends page, filtered like get_lines_plots:
+
+- GET /export/subsidios.csv?departamento=&municipio=&programa=
+- GET /export/subsidios.parquet?departamento=&municipio=&programa=
+
+The selection is resolved on the dataset's indexes (FilteredView), and the response is a generator that
+copies and serializes SUBSIDIOS_EXPORT_CHUNK_ROWS rows at a time: CSV blocks, or one Parquet row group
+per chunk. Neither the filtered frame nor the whole file is ever held in memory, and the worker only
+spends CPU on a chunk when the client is ready to receive it.
+"""
+import io
+
+from flask import Response, abort, request
+
+from common import dataset
+from common.indexes import FilteredView
+from definitions import EXPORT_CHUNK_ROWS
+
+
+FILTERS = ['departamento', 'municipio', 'programa']
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def selected_rows() -> FilteredView:
+    """The rows matching the department, municipality and program parameters (repeatable, empty = all)."""
+    return dataset.view.where(**{name: request.args.getlist(name) for name in FILTERS})
+
+
+def iter_chunks(view: FilteredView, chunk_rows: int):
+    """Yields the rows of view as DataFrames of at most chunk_rows rows, copying one chunk at a time."""
+    source = view.source
+    if view.positions is None:
+        for start in range(0, len(source), chunk_rows):
+            yield source.iloc[start:start + chunk_rows]
+    else:
+        for start in range(0, len(view.positions), chunk_rows):
+            yield source.take(view.positions[start:start + chunk_rows])
+
+
+def csv_chunks(view: FilteredView, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Yields the CSV encoding of view block by block; the header comes with the first block."""
+    yield view.source.head(0).to_csv(index=False).encode('utf-8')
+    for chunk in iter_chunks(view, chunk_rows):
+        yield chunk.to_csv(index=False, header=False).encode('utf-8')
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that keeps what was written until drain() hands it over."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def parquet_chunks(view: FilteredView, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Yields a Parquet file holding view, written and sent one row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(view.source.head(0), preserve_index=False)
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for chunk in iter_chunks(view, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_rows(file_format: str) -> Response:
+    if file_format not in MIMETYPES:
+        abort(404)
+
+    # Resolved now, so the download reads the snapshot of this request even if the data is refreshed meanwhile
+    view = selected_rows()
+    chunks = csv_chunks(view) if file_format == 'csv' else parquet_chunks(view)
+
+    response = Response(chunks, mimetype=MIMETYPES[file_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="subsidios_{dataset.version}.{file_format}"'
+    response.headers['X-Export-Rows'] = str(len(view))
+    # Reverse proxies would otherwise buffer the whole file before passing it on
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def install_export(app, prefix: str = '/export') -> None:
+    """Adds the streaming download route to app.server under prefix."""
+    app.server.add_url_rule(f"{prefix}/subsidios.<file_format>", 'export_rows', export_rows)
@@ -0,0 +1,99 @@
+"""
+Prometheus metrics for the Flask server behind the Dash app and for every Dash callback.
+
+Latency and response sizes are histograms, so p50/p99 per callback come from histogram_quantile().
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn), each worker writes its samples to that directory and
+/metrics merges all of them, so the counters cover every worker and not only the one that answers.
+"""
+import json
+import os
+import time
+
+from flask import Flask, Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+
+DASH_UPDATE_PATH = '/_dash-update-component'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+HTTP_LATENCY = Histogram(
+    'subsidios_http_request_duration_seconds', 'Time to answer an HTTP request',
+    ['method', 'endpoint', 'status'], buckets=LATENCY_BUCKETS
+)
+CALLBACK_LATENCY = Histogram(
+    'subsidios_callback_duration_seconds', 'Time to run a Dash callback and serialize its output',
+    ['callback'], buckets=LATENCY_BUCKETS
+)
+CALLBACK_ERRORS = Counter(
+    'subsidios_callback_errors_total', 'Dash callbacks that failed (HTTP status 400 or more)', ['callback']
+)
+CALLBACK_RESPONSE_BYTES = Histogram(
+    'subsidios_callback_response_bytes', 'Size of the serialized callback response',
+    ['callback'], buckets=SIZE_BUCKETS
+)
+
+
+def callback_name(app, payload: dict | None) -> str:
+    """
+    Returns module.function of the callback a Dash update request runs, e.g. pages.analysis.build_graph,
+    falling back to its output id for clientside or unknown callbacks.
+    """
+    output = (payload or {}).get('output', 'unknown')
+    func = app.callback_map.get(output, {}).get('callback')
+    if func is None:
+        return output
+    return f"{func.__module__}.{func.__name__}"
+
+
+def dash_update_path(app) -> str:
+    """The path Dash callbacks are posted to, under the app's routes_pathname_prefix."""
+    return app.config.routes_pathname_prefix + DASH_UPDATE_PATH.lstrip('/')
+
+
+def metrics_response() -> Response:
+    """Returns every metric in the Prometheus text format, merged across worker processes if configured."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        payload = generate_latest(registry)
+    else:
+        payload = generate_latest()
+    return Response(payload, mimetype=CONTENT_TYPE_LATEST)
+
+
+def install_metrics(app, path: str = '/metrics') -> None:
+    """
+    Times every request to app.server and every Dash callback. Each response gets a Server-Timing header
+    with its duration, and `path` serves the metrics to Prometheus.
+    """
+    server: Flask = app.server
+    update_path = dash_update_path(app)
+
+    @server.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def record_metrics(response):
+        if 'metrics_start' not in g:
+            return response
+        elapsed = time.perf_counter() - g.pop('metrics_start')
+
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_LATENCY.labels(request.method, endpoint, str(response.status_code)).observe(elapsed)
+
+        description = endpoint
+        if request.path == update_path and request.method == 'POST':
+            description = callback_name(app, request.get_json(silent=True))
+            CALLBACK_LATENCY.labels(description).observe(elapsed)
+            if response.status_code >= 400:
+                CALLBACK_ERRORS.labels(description).inc()
+            if not response.direct_passthrough:
+                CALLBACK_RESPONSE_BYTES.labels(description).observe(response.calculate_content_length() or 0)
+
+        response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.1f};desc={json.dumps(description)}')
+        return response
+
+    server.add_url_rule(path, 'metrics', metrics_response)
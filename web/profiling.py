@@ -0,0 +1,207 @@
+"""
+On-demand CPU (cProfile) and allocation (tracemalloc) profiles of Dash callback requests.
+
+A callback request is profiled when SUBSIDIOS_PROFILE=1, or when it carries the header
+X-Subsidios-Profile with the value of SUBSIDIOS_PROFILE_TOKEN. Each profile is written to
+SUBSIDIOS_PROFILE_DIR as three files sharing a name:
+
+- <name>.prof: pstats dump, readable with `python -m pstats` or snakeviz;
+- <name>.alloc.txt: the allocation sites that grew most during the request;
+- <name>.json: the callback, its inputs, the duration, the peak traced memory and the top functions.
+
+/_profiles lists the most recent ones.
+"""
+import cProfile
+import hmac
+import html
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+from datetime import datetime, timezone
+from flask import Response, abort, request, send_from_directory
+
+from definitions import PROFILE_ALL, PROFILE_DIR, PROFILE_KEEP, PROFILE_TOKEN, ROOT_DIR
+from .metrics import callback_name, dash_update_path
+
+
+PROFILE_HEADER = 'X-Subsidios-Profile'
+
+# tracemalloc is process-wide, so only one request is profiled at a time; others run unprofiled
+_profile_lock = threading.Lock()
+
+
+def token_matches(token: str | None) -> bool:
+    """True when token is SUBSIDIOS_PROFILE_TOKEN, compared in constant time so timing does not leak it."""
+    return bool(PROFILE_TOKEN) and token is not None and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+def wants_profile() -> bool:
+    """True when the current request should be profiled: profiling is on for all requests or the token matches."""
+    if PROFILE_ALL:
+        return True
+    return token_matches(request.headers.get(PROFILE_HEADER))
+
+
+def allowed_to_browse() -> bool:
+    """The profile index is served when profiling is on for all requests, or to holders of the token."""
+    if PROFILE_ALL:
+        return True
+    return token_matches(request.headers.get(PROFILE_HEADER) or request.args.get('token'))
+
+
+def short_path(file_name: str) -> str:
+    """Shows the repository's files relative to its root and everything else (site-packages) by file name."""
+    if file_name.startswith(ROOT_DIR + os.sep):
+        return os.path.relpath(file_name, ROOT_DIR)
+    return os.path.join(*file_name.split(os.sep)[-2:]) if os.path.isabs(file_name) else file_name
+
+
+def top_functions(profiler: cProfile.Profile, limit: int = 15) -> list[dict]:
+    """Returns the functions with the largest cumulative time in the profile."""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (file_name, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f"{short_path(file_name)}:{line}({function})",
+            'calls': calls,
+            'own_seconds': own,
+            'cumulative_seconds': cumulative,
+        })
+    return sorted(rows, key=lambda row: row['cumulative_seconds'], reverse=True)[:limit]
+
+
+def write_profile(name: str, profiler: cProfile.Profile, before, after, metadata: dict, directory: str) -> None:
+    """Writes the CPU profile, the allocation diff and the metadata of one request."""
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, name)
+
+    profiler.dump_stats(f"{base}.prof")
+    with open(f"{base}.alloc.txt", 'w', encoding='utf-8') as file:
+        for stat in after.compare_to(before, 'lineno')[:50]:
+            file.write(f"{stat}\n")
+    with open(f"{base}.json", 'w', encoding='utf-8') as file:
+        json.dump({**metadata, 'top_functions': top_functions(profiler)}, file, indent=2, default=str)
+
+
+def prune_profiles(directory: str, keep: int) -> None:
+    """Deletes all but the `keep` most recent profiles in directory."""
+    names = sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+    for name in names[:-keep] if keep > 0 else []:
+        for suffix in ('.json', '.prof', '.alloc.txt'):
+            path = os.path.join(directory, name + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def profiled(app, view, directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+    """Wraps the Dash callback view so the requests selected by wants_profile() are profiled."""
+
+    def wrapper(*args, **kwargs):
+        if not wants_profile() or not _profile_lock.acquire(blocking=False):
+            return view(*args, **kwargs)
+
+        try:
+            payload = request.get_json(silent=True) or {}
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+
+            profiler.enable()
+            try:
+                response = view(*args, **kwargs)
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - start
+                after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            callback = callback_name(app, payload)
+            timestamp = datetime.now(timezone.utc)
+            name = f"{timestamp:%Y%m%dT%H%M%S%f}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', callback)[:80]}"
+            write_profile(name, profiler, before, after, {
+                'name': name,
+                'timestamp': timestamp.isoformat(),
+                'callback': callback,
+                'output': payload.get('output'),
+                'inputs': payload.get('inputs'),
+                'state': payload.get('state'),
+                'seconds': elapsed,
+                'peak_traced_bytes': peak,
+            }, directory)
+            prune_profiles(directory, keep)
+            return response
+        finally:
+            _profile_lock.release()
+
+    return wrapper
+
+
+def profile_index(directory: str = PROFILE_DIR) -> Response:
+    """HTML list of the recent profiles, newest first, with their callback, inputs, time and hot spots."""
+    if not allowed_to_browse():
+        abort(404)
+
+    entries = []
+    if os.path.isdir(directory):
+        for file_name in sorted(os.listdir(directory), reverse=True):
+            if file_name.endswith('.json'):
+                with open(os.path.join(directory, file_name), encoding='utf-8') as file:
+                    entries.append(json.load(file))
+
+    token = request.args.get('token')
+    query = f"?token={html.escape(token)}" if token else ''
+    rows = []
+    for entry in entries:
+        links = ' '.join(
+            f'<a href="/_profiles/{entry["name"]}{suffix}{query}">{suffix}</a>' for suffix in ('.prof', '.alloc.txt', '.json')
+        )
+        hot = '<br>'.join(
+            f"{row['cumulative_seconds'] * 1000:.1f} ms {html.escape(row['function'])}" for row in entry['top_functions'][:5]
+        )
+        rows.append(
+            f"<tr><td>{html.escape(entry['timestamp'])}</td><td>{html.escape(entry['callback'])}</td>"
+            f"<td><code>{html.escape(json.dumps(entry['inputs'], ensure_ascii=False))}</code></td>"
+            f"<td>{entry['seconds'] * 1000:.1f} ms</td><td>{entry['peak_traced_bytes'] / 1e6:.1f} MB</td>"
+            f"<td><small>{hot}</small></td><td>{links}</td></tr>"
+        )
+
+    page = (
+        "<html><head><title>Perfiles</title></head><body><h1>Perfiles recientes</h1>"
+        "<table border='1' cellpadding='4'><tr><th>Fecha</th><th>Callback</th><th>Entradas</th>"
+        "<th>Tiempo</th><th>Memoria máxima</th><th>Funciones más costosas</th><th>Archivos</th></tr>"
+        f"{''.join(rows)}</table></body></html>"
+    )
+    return Response(page, mimetype='text/html')
+
+
+def profile_file(file_name: str, directory: str = PROFILE_DIR) -> Response:
+    """Serves one file of a profile; the .prof dumps as attachments, to be opened with pstats or snakeviz."""
+    if not allowed_to_browse():
+        abort(404)
+    return send_from_directory(directory, file_name, as_attachment=file_name.endswith('.prof'))
+
+
+def dash_update_endpoint(app) -> str:
+    """The Flask endpoint serving Dash callbacks, found by its route under the app's routes_pathname_prefix."""
+    path = dash_update_path(app)
+    for rule in app.server.url_map.iter_rules():
+        if rule.rule == path:
+            return rule.endpoint
+    raise LookupError(f"No route for Dash callbacks at {path}")
+
+
+def install_profiling(app, directory: str = PROFILE_DIR) -> None:
+    """Wraps the Dash callback dispatch with the profiler and serves the profiles under /_profiles."""
+    server = app.server
+    endpoint = dash_update_endpoint(app)
+    server.view_functions[endpoint] = profiled(app, server.view_functions[endpoint], directory)
+    server.add_url_rule('/_profiles', 'profiles', lambda: profile_index(directory))
+    server.add_url_rule('/_profiles/<path:file_name>', 'profile_file', lambda file_name: profile_file(file_name, directory))